@@ -215,15 +215,9 @@ class Points:
     def calc_box(self):
         if not self.verts:
             return Vector((0, 0, 0)), Vector((0, 0, 0))
-        mins = Vector(self.verts[0])
-        maxs = Vector(self.verts[0])
-        for v in self.verts:
-            mins.x = min(mins.x, v.x)
-            mins.y = min(mins.y, v.y)
-            mins.z = min(mins.z, v.z)
-            maxs.x = max(maxs.x, v.x)
-            maxs.y = max(maxs.y, v.y)
-            maxs.z = max(maxs.z, v.z)
+        columns = list(zip(*self.verts))
+        mins = Vector(map(min, columns))
+        maxs = Vector(map(max, columns))
         size = (maxs - mins)
         center = (maxs + mins) / 2
         return size, center
@@ -0,0 +1,119 @@
+# vim:ts=4:et
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Shrink the meshes in .mu files: strip the per-vertex blocks their role
+# does not need (collider meshes keep only vertices and triangles, rendered
+# meshes keep what their materials' shaders read), weld identical vertices
+# and drop unused ones. -k keeps the named block (eg, -k colors).
+#   python3 compactmesh.py [-n] [-k block] [-o output.mu] model.mu [...]
+
+from mu import MuColliderMesh, vertex_attributes
+from rewrite import parse_args, rewrite_models
+import sys
+
+bumped = {"uvs", "normals", "tangents", "colors"}
+diffuse = {"uvs", "normals", "colors"}
+transparent = {"uvs", "normals"}
+
+# per-vertex blocks read by the stock KSP shaders (see shader/*.cfg);
+# meshes with any other shader keep all their blocks
+shader_blocks = {
+    "KSP/Alpha/Cutoff": transparent,
+    "KSP/Alpha/Translucent": transparent,
+    "KSP/Alpha/Translucent Additive": transparent,
+    "KSP/Alpha/Translucent Specular": diffuse,
+    "KSP/Bumped": bumped,
+    "KSP/Bumped Specular": bumped,
+    "KSP/Bumped Specular (Mapped)": bumped,
+    "KSP/Diffuse": diffuse,
+    "KSP/Emissive/Bumped Specular": bumped,
+    "KSP/Emissive/Bumped Specular (Mapped)": bumped,
+    "KSP/Emissive/Diffuse": diffuse,
+    "KSP/Emissive/Specular": diffuse,
+    "KSP/InternalSpace": bumped | {"uv2s"},
+    "KSP/Specular": diffuse,
+    "KSP/Specular (Transparent)": transparent,
+    "KSP/Unlit": {"uvs"},
+    "KSP/UnlitColor": {"uvs"},
+}
+
+def needed_blocks(mu, materials):
+    blocks = set()
+    for index in materials:
+        if not 0 <= index < len(mu.materials):
+            return set(vertex_attributes)
+        shader = mu.materials[index].shaderName
+        if shader not in shader_blocks:
+            return set(vertex_attributes)
+        blocks |= shader_blocks[shader]
+    return blocks
+
+def mesh_roles(mu):
+    # (name, mesh, blocks needed) for every mesh in the model
+    for obj in mu.hierarchy().objects:
+        name = obj.transform.name
+        if hasattr(obj, "shared_mesh") and obj.shared_mesh:
+            if getattr(obj, "renderer", None):
+                blocks = needed_blocks(mu, obj.renderer.materials)
+            else:
+                blocks = set(vertex_attributes)
+            yield name, obj.shared_mesh, blocks
+        smr = getattr(obj, "skinned_mesh_renderer", None)
+        if smr:
+            blocks = needed_blocks(mu, smr.materials) | {"boneWeights"}
+            yield name, smr.mesh, blocks
+        if isinstance(getattr(obj, "collider", None), MuColliderMesh):
+            yield name + " (collider)", obj.collider.mesh, set()
+
+def compact(mu, keep):
+    for name, mesh, blocks in mesh_roles(mu):
+        num_verts = len(mesh.verts)
+        num_tris = sum(map(len, mesh.submeshes))
+        stripped = []
+        for block in vertex_attributes:
+            if (len(getattr(mesh, block)) and block not in blocks
+                and block not in keep):
+                setattr(mesh, block, [])
+                stripped.append(block)
+        mesh.compact()
+        print("    %-32s verts %6d -> %6d, tris %6d -> %6d%s"
+              % (name[:32], num_verts, len(mesh.verts), num_tris,
+                 sum(map(len, mesh.submeshes)),
+                 stripped and ", stripped " + " ".join(stripped) or ""))
+
+def main():
+    keep = set()
+    opts, args = parse_args("compactmesh.py [-n] [-k block] [-o output.mu] "
+                            "<mu-file> [mu-file ...]", "k:")
+    for o, a in opts:
+        if o == "-k":
+            if a not in vertex_attributes:
+                print("unknown block: %s (one of %s)"
+                      % (a, ", ".join(vertex_attributes)))
+                sys.exit(1)
+            keep.add(a)
+
+    def shrink(path, mu):
+        print(path)
+        compact(mu, keep)
+        return True
+    rewrite_models(opts, args, shrink, arrays=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# vim:ts=4:et
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Compare load throughput of uncompressed and compressed .mu files. Slow
+# storage is simulated by throttling reads to the given rate.
+#   python3 compressbench.py [-r MB/s] model.mu [model2.mu ...]
+
+from mu import Mu
+import getopt
+import io
+import os
+import sys
+import tempfile
+import time
+
+class SlowFile(io.RawIOBase):
+    """Raw binary file whose reads are throttled to rate bytes per second."""
+    def __init__(self, path, rate):
+        self.file = open(path, "rb", buffering=0)
+        self.rate = rate
+    def readinto(self, buf):
+        count = self.file.readinto(buf)
+        if self.rate:
+            time.sleep(count / self.rate)
+        return count
+    def seek(self, offset, whence=0):
+        return self.file.seek(offset, whence)
+    def tell(self):
+        return self.file.tell()
+    def seekable(self):
+        return True
+    def readable(self):
+        return True
+    def close(self):
+        self.file.close()
+        super().close()
+
+def load_time(path, rate, repeat):
+    best = None
+    for i in range(repeat):
+        f = io.BufferedReader(SlowFile(path, rate), 64 * 1024)
+        start = time.perf_counter()
+        mu = Mu()
+        if not mu.read(f):
+            print("could not read: " + path)
+            sys.exit(1)
+        elapsed = time.perf_counter() - start
+        f.close()
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main():
+    rate = 50.0
+    repeat = 3
+    opts, args = getopt.getopt(sys.argv[1:], "r:n:")
+    for o, a in opts:
+        if o == "-r":
+            rate = float(a)
+        elif o == "-n":
+            repeat = int(a)
+    if not args:
+        print("compressbench.py [-r MB/s] [-n repeat] <mu-file> [mu-file ...]")
+        sys.exit(1)
+    rate *= 1024 * 1024
+    print("simulated storage: %.1f MB/s" % (rate / (1024 * 1024)))
+    print("%-24s %-5s %10s %7s %8s %10s" % ("file", "type", "bytes", "ratio",
+                                            "load s", "model MB/s"))
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in args:
+            mu = Mu()
+            if not mu.read(path):
+                print("could not read: " + path)
+                sys.exit(1)
+            base = os.path.join(tmp, "model.mu")
+            mu.write(base)
+            size = os.path.getsize(base)
+            name = os.path.basename(path)
+            for ext in ["", ".gz", ".xz", ".bz2"]:
+                fname = base + ext
+                if ext:
+                    mu.write(fname)
+                csize = os.path.getsize(fname)
+                t = load_time(fname, rate, repeat)
+                print("%-24s %-5s %10d %7.3f %8.3f %10.2f"
+                      % (name[:24], ext[1:] or "mu", csize, csize / size, t,
+                         size / t / (1024 * 1024)))
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,9 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 #
 # ##### END GPL LICENSE BLOCK #####
-from mu import Mu
+from mu import read_many
+from contextlib import redirect_stdout
+import io
 import sys
 
 def dump_dict(thing, mu, level, dump_funcs):
@@ -32,7 +34,13 @@ def dump_thing(thing, mu, level, exclude, dump_funcs):
     for a in dir(thing):
         if a[0] == "_" or a in ["read", "write"] or a in exclude:
             continue
+        if not hasattr(thing, a):
+            # unset slot
+            continue
         attr = getattr(thing, a)
+        if callable(attr):
+            # methods (eg, fingerprint)
+            continue
         n = attr.__class__.__name__
         if type(attr) is dict and attr:
             print(("%s%s = {" % ("    " * level, a)))
@@ -160,16 +168,31 @@ def dump_object(mu, obj, level=0):
     for child in obj.children:
         dump_object(mu, child, level + 1)
 
-def dump(fname):
-    mu = Mu()
-    if not mu.read(fname):
-        print("could not read: " + fname)
-        raise
-    print(mu.version)
-    dump_textures(mu)
-    dump_materials(mu)
-    dump_object(mu, mu.obj)
-
-for f in sys.argv[1:]:
-    print(f)
-    dump(f)
+def dump(mu):
+    # runs in a read_many worker: the dump comes back as text
+    with redirect_stdout(io.StringIO()) as out:
+        print(mu.version)
+        dump_textures(mu)
+        dump_materials(mu)
+        dump_object(mu, mu.obj)
+    return out.getvalue()
+
+def profile(mu):
+    # runs in a read_many worker: the model was read with profiling, so
+    # write it out (to memory) as well to show both sides
+    mu.write(io.BytesIO())
+    return mu.profile.format() + "\n"
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    select = dump
+    if "--profile" in args:
+        args.remove("--profile")
+        select = profile
+    for f, text in read_many(args, select=select, arrays=False,
+                             profile=select is profile):
+        print(f)
+        if text is None:
+            print("could not read: " + f)
+            sys.exit(1)
+        print(text, end="")
@@ -212,7 +212,8 @@ special_modelTypes = {
     'VOLUME': {},
 }
 
-def export_object(obj, filepath):
+def export_object(obj, filepath, optimize_vertex_cache=False,
+                  simplify_animations=False, merge_materials=False):
     animations = collect_animations(obj)
     anim_root = find_path_root(animations)
     mu = Mu()
@@ -226,6 +227,7 @@ def export_object(obj, filepath):
     mu.models = []
     mu.volumes = {}
     mu.messages = []
+    mu.optimize_vertex_cache = optimize_vertex_cache
     mu.internals = []
     mu.type = obj.muproperties.modelType
     if mu.type == 'NONE':
@@ -243,9 +245,16 @@ def export_object(obj, filepath):
     mu.materials.sort(key=lambda x: x.index)
     mu.textures = list(mu.textures.values())
     mu.textures.sort(key=lambda x: x.index)
+    if merge_materials:
+        materials, textures = mu.merge_materials()
+        if materials or textures:
+            mu.messages.append(({'INFO'}, f"merged {materials} duplicate materials and {textures} duplicate textures"))
     if anim_root and anim_root in mu.object_paths:
         anim_root_obj = mu.object_paths[anim_root]
         anim_root_obj.animation = make_animations(mu, animations, anim_root)
+        if simplify_animations:
+            keys, curves = mu.simplify_animations()
+            mu.messages.append(({'INFO'}, f"removed {keys} animation keys ({curves} constant curves)"))
     mu.write(filepath)
     mu.skin_volume, mu.ext_volume = model_volume(obj, mu.special)
     calc_volumes(mu)
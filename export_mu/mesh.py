@@ -19,10 +19,13 @@
 
 # <pep8 compliant>
 
+from array import array
+
 import bpy
 from mathutils import Vector, Matrix
 
-from ..mu import MuMesh, MuRenderer, MuSkinnedMeshRenderer, MuBoneWeight
+from ..mu import MuMesh, MuRenderer, MuSkinnedMeshRenderer, MuBoneWeights
+from ..mu import MuStream, acmr, tipsify, first_use_order
 from ..utils import collect_modifiers, collect_armature_modifiers
 
 from .material import make_material
@@ -38,6 +41,8 @@ Matrix_YZ = Matrix(((1,0,0,0),
                     (0,0,0,1)))
 
 MU_MAX_VERTS = 65534
+# vertices per chunk when streaming mesh attributes to the writer
+STREAM_CHUNK = 4096
 
 def build_submeshes(mesh):
     submeshes = []
@@ -56,6 +61,19 @@ def make_tris(mesh, submeshes, vertex_map):
             i += 1
     return submeshes
 
+def optimize_vertex_cache(mu, obj, submeshes, vertex_map, num_verts):
+    # reorder the triangles for the GPU's vertex cache, then number the
+    # vertices in order of first use
+    before = acmr(submeshes)
+    submeshes = [tipsify(tris, num_verts) for tris in submeshes]
+    remap, used = first_use_order(submeshes, num_verts)
+    submeshes = [[(remap[a], remap[b], remap[c]) for a, b, c in tris]
+                 for tris in submeshes]
+    vertex_map = [remap[v] for v in vertex_map]
+    mu.messages.append(({'INFO'}, f"{obj.name}: vertex cache ACMR "
+                         f"{before:.3f} -> {acmr(submeshes):.3f}"))
+    return submeshes, vertex_map
+
 def get_mesh(obj):
     modifiers = collect_modifiers(obj)
     for mod in modifiers:
@@ -129,100 +147,109 @@ def make_vertex_map(vertex_data):
         vmap.append(vdict[v])
     return vmap, len(vdict)
 
-def get_key_normals(shape_key):
-    normals = shape_key.normals_split_get()
-    normals = zip(normals[0:-2:3], normals[1:-1:3], normals[2::3])
-    normals = list(map(lambda n: Vector(n), normals))
-    return normals
+def vertex_loops(vertex_map, num_verts):
+    # for each exported vertex, a loop that maps to it (all such loops have
+    # the same vertex data)
+    loops = array("i", [0]) * num_verts
+    for i, vind in enumerate(vertex_map):
+        loops[vind] = i
+    return loops
+
+def loop_chunks(loops):
+    for start in range(0, len(loops), STREAM_CHUNK):
+        yield loops[start:start + STREAM_CHUNK]
 
-def get_key_verts(shape_key):
-    verts = list(map(lambda data: data.co, shape_key.data))
-    return verts
+def stream(loops, width, get):
+    # a MuStream of get(loop) for each exported vertex, produced
+    # STREAM_CHUNK vertices at a time as the mesh is written
+    def chunks():
+        for chunk in loop_chunks(loops):
+            yield [get(l) for l in chunk]
+    return MuStream(len(loops), width, chunks)
 
-def process_shape_keys(mesh, mumesh, vertex_map, vertex_data):
+def process_shape_keys(mesh, mumesh, loops, vertex_data):
+    # The shape keys are appended to the mesh data as extra copies of the
+    # vertices holding the deltas from the relative key. They are produced
+    # STREAM_CHUNK vertices at a time while the mesh is written (MuStream)
+    # rather than being built up front. Blender hands over a key's split
+    # normals all at once, so only those are held for a whole key.
     num_shapes = len(mesh.shape_keys.key_blocks)
-    num_verts = len(mumesh.verts)
+    num_verts = len(loops)
     new_verts = (num_shapes - 1) * num_verts
+
+    def padded(data, pad):
+        def chunks():
+            if len(data):
+                yield from data.chunks()
+            for i in range(num_shapes - 1):
+                for chunk in loop_chunks(loops):
+                    yield [pad] * len(chunk)
+        return MuStream(len(data) + new_verts, len(pad), chunks)
     # UVs and vertex colors can't be keyed, but the arrays need to be the
     # same length. Extended with 0s for better compressibility in zip files
-    if (hasattr(mumesh, "uvs")):
-        mumesh.uvs.extend([Vector((0, 0))] * new_verts)
-    if (hasattr(mumesh, "uv2s")):
-        mumesh.uv2s.extend([Vector((0, 0))] * new_verts)
-    if (hasattr(mumesh, "colors")):
-        mumesh.colors.extend([Vector((1, 1, 1, 1))] * new_verts)
-
-    if (hasattr(mumesh, "tangents")):
-        #unfornately, don't know how to do tangents properly, so set
-        #deltas to 0 FIXME
-        mumesh.tangents.extend([(0, 0, 0, 0)] * new_verts)
-    mumesh.verts = mumesh.verts * num_shapes
-    if (hasattr(mumesh, "normals")):
-        mumesh.normals = mumesh.normals * num_shapes
+    mumesh.uvs = padded(mumesh.uvs, (0, 0))
+    mumesh.uv2s = padded(mumesh.uv2s, (0, 0))
+    mumesh.colors = padded(mumesh.colors, (1, 1, 1, 1))
+    #unfornately, don't know how to do tangents properly, so set
+    #deltas to 0 FIXME
+    mumesh.tangents = padded(mumesh.tangents, (0, 0, 0, 0))
+
     basis = mesh.shape_keys.reference_key
-    basis_verts = get_key_verts(basis)
-    basis_normals = get_key_normals(basis)
-    #ensure base mesh data reflects the basis key
-    for i, vind in enumerate(vertex_map):
-        v = vertex_data[i][0]
-        mumesh.verts[vind] = basis_verts[v]
-        mumesh.normals[vind] = basis_normals[i]
-    base_ind = num_verts
-    for key in mesh.shape_keys.key_blocks:
-        if key.name == basis.name:
-            continue
+    keys = [key for key in mesh.shape_keys.key_blocks
+            if key.name != basis.name]
+    for key in keys:
         print(f"shape key: {key.name}")
-        ref_verts = get_key_verts(key.relative_key)
-        ref_normals = get_key_normals(key.relative_key)
-        verts = get_key_verts(key)
-        normals = get_key_normals(key)
-        for i, vind in enumerate(vertex_map):
-            v = vertex_data[i][0]
-            vert = verts[v] - ref_verts[v]
-            norm = normals[i] - ref_normals[i]
-            mumesh.verts[base_ind + vind] = vert
-            mumesh.normals[base_ind + vind] = norm
-        base_ind += num_verts
-
-
-def make_mumesh(mesh, submeshes, vertex_data, vertex_map, num_verts):
-    verts = [None] * num_verts
-    groups = [None] * num_verts
-    uvs = [None] * num_verts
-    uv2s = [None] * num_verts
-    normals = [None] * num_verts
-    tangents = [None] * num_verts
-    bitangents = [None] * num_verts
-    colors = [None] * num_verts
-    for i, vind in enumerate(vertex_map):
-        v, n, uv, uv2, t, bts, col = vertex_data[i]
-        verts[vind] = v
-        normals[vind] = n
-        uvs[vind] = uv
-        uv2s[vind] = uv2
-        tangents[vind] = t
-        bitangents[vind] = bts
-        colors[vind] = col
-    for i, v in enumerate(verts):
-        verts[i] = mesh.vertices[v].co
-        groups[i] = mesh.vertices[v].groups
-    if tangents[0] != None:
-        for i, t in enumerate(tangents):
-            tangents[i] = tuple(t) + (bitangents[i],)
+
+    def vert_chunks():
+        #ensure base mesh data reflects the basis key
+        data = basis.data
+        for chunk in loop_chunks(loops):
+            yield [data[vertex_data[l][0]].co for l in chunk]
+        for key in keys:
+            data = key.data
+            ref_data = key.relative_key.data
+            for chunk in loop_chunks(loops):
+                deltas = [None] * len(chunk)
+                for i, l in enumerate(chunk):
+                    v = vertex_data[l][0]
+                    deltas[i] = data[v].co - ref_data[v].co
+                yield deltas
+
+    def normal_chunks():
+        # normals_split_get gives the loop normals as a flat list
+        normals = basis.normals_split_get()
+        for chunk in loop_chunks(loops):
+            yield [normals[l * 3:l * 3 + 3] for l in chunk]
+        for key in keys:
+            normals = key.normals_split_get()
+            ref_normals = key.relative_key.normals_split_get()
+            for chunk in loop_chunks(loops):
+                yield [normals[i] - ref_normals[i]
+                       for l in chunk for i in range(l * 3, l * 3 + 3)]
+    mumesh.verts = MuStream(num_shapes * num_verts, 3, vert_chunks)
+    mumesh.normals = MuStream(num_shapes * num_verts, 3, normal_chunks)
+
+
+def make_mumesh(mesh, submeshes, vertex_data, loops):
+    # The vertex attributes are streamed from the loop data as the mesh is
+    # written (see stream) rather than being built up front.
+    vertices = mesh.vertices
+    v, n, uv, uv2, t, bts, col = vertex_data[loops[0]]
     mumesh = MuMesh()
     mumesh.submeshes = submeshes
-    mumesh.verts = verts
-    mumesh.groups = groups
-    if normals[0] != None:
-        mumesh.normals = normals
-    if uvs[0] != None:
-        mumesh.uvs = uvs
-    if uv2s[0] != None:
-        mumesh.uv2s = uv2s
-    if tangents[0] != None:
-        mumesh.tangents = tangents
-    if colors[0] != None:
-        mumesh.colors = colors
+    mumesh.verts = stream(loops, 3, lambda l: vertices[vertex_data[l][0]].co)
+    mumesh.groups = [vertices[vertex_data[l][0]].groups for l in loops]
+    if n != None:
+        mumesh.normals = stream(loops, 3, lambda l: vertex_data[l][1])
+    if uv != None:
+        mumesh.uvs = stream(loops, 2, lambda l: vertex_data[l][2])
+    if uv2 != None:
+        mumesh.uv2s = stream(loops, 2, lambda l: vertex_data[l][3])
+    if t != None:
+        mumesh.tangents = stream(loops, 4, lambda l: (tuple(vertex_data[l][4])
+                                                      + (vertex_data[l][5],)))
+    if col != None:
+        mumesh.colors = stream(loops, 4, lambda l: vertex_data[l][6])
     return mumesh
 
 def make_mesh(mu, obj):
@@ -238,11 +265,15 @@ def make_mesh(mu, obj):
     vertex_map, num_verts = make_vertex_map(vertex_data)
     submeshes = build_submeshes(mesh)
     submeshes = make_tris(mesh, submeshes, vertex_map)
+    if mu.optimize_vertex_cache and not is_collider(obj):
+        submeshes, vertex_map = optimize_vertex_cache(mu, obj, submeshes,
+                                                      vertex_map, num_verts)
     #pprint(submeshes)
-    mumesh = make_mumesh(mesh, submeshes, vertex_data, vertex_map, num_verts)
+    loops = vertex_loops(vertex_map, num_verts)
+    mumesh = make_mumesh(mesh, submeshes, vertex_data, loops)
     mesh = obj.data
     if not is_collider(obj) and mesh.shape_keys:
-        process_shape_keys(mesh, mumesh, vertex_map, vertex_data)
+        process_shape_keys(mesh, mumesh, loops, vertex_data)
     if len(mumesh.verts) > MU_MAX_VERTS:
         mu.messages.append(({'WARNING'}, f"Mesh has more than {MU_MAX_VERTS} "
                             "vertices: KSP will not import it properly "
@@ -278,7 +309,7 @@ def mesh_bones(obj, mumesh, armature):
         boneset.add(bone.name)
     bones = []
     boneindices = {}
-    mumesh.boneWeights = [None] * len(mumesh.verts)
+    mumesh.boneWeights = MuBoneWeights(len(mumesh.verts))
     for grp in obj.vertex_groups:
         if grp.name in boneset:
             boneindices[grp.name] = len(bones)
@@ -295,12 +326,9 @@ def mesh_bones(obj, mumesh, armature):
         weights = weights[:4]
         if len(weights) > maxlen:
             maxlen = len(weights)
-        if len(weights) < 4:
-            weights += [(0,0)]*(4 - len(weights))
-        bw = MuBoneWeight()
+        bw = mumesh.boneWeights[i]
         bw.indices = list(map(lambda w: w[0], weights))
         bw.weights = list(map(lambda w: w[1], weights))
-        mumesh.boneWeights[i] = bw
     return bones, maxlen
 
 def make_bindPoses(smr, armature, arm_mat):
@@ -349,12 +377,7 @@ def create_skinned_mesh(obj, mu, armature):
     #FIXME center, size, updateWhenOffscreen
     #however, with updateWhenOffscreen = 1, Unity will recaculate the mesh
     #bounds every frame, so take the easy way for now
-    mins = Vector(smr.mesh.verts[0])
-    maxs = Vector(smr.mesh.verts[0])
-    for v in smr.mesh.verts:
-        for i in range(3):
-            mins[i] = min(v[i], mins[i])
-            maxs[i] = max(v[i], maxs[i])
+    mins, maxs = map(Vector, smr.mesh.bounds())
     smr.center = (maxs + mins) / 2
     smr.size = (maxs - mins) / 2
     smr.updateWhenOffscreen = 1
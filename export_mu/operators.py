@@ -21,7 +21,7 @@
 
 import bpy
 from bpy_extras.io_utils import ExportHelper
-from bpy.props import StringProperty, EnumProperty
+from bpy.props import StringProperty, EnumProperty, BoolProperty
 from mathutils import Vector
 from math import pi
 
@@ -33,10 +33,13 @@ tau = 180 / pi
 from . import export
 from . import volume
 
-def export_mu(operator, context, filepath):
+def export_mu(operator, context, filepath, optimize_vertex_cache=False,
+              simplify_animations=False, merge_materials=False):
     collections = export.enable_collections()
     try:
-        mu = export.export_object (context.active_object, filepath)
+        mu = export.export_object (context.active_object, filepath,
+                                   optimize_vertex_cache, simplify_animations,
+                                   merge_materials)
     finally:
         export.restore_collections(collections)
     for m in mu.messages:
@@ -56,6 +59,15 @@ class KSPMU_OT_ExportMu(bpy.types.Operator, ExportHelper):
 
     filename_ext = ".mu"
     filter_glob: StringProperty(default="*.mu", options={'HIDDEN'})
+    optimize_vertex_cache: BoolProperty(name = "Optimize Vertex Cache",
+        description = "Reorder triangles and vertices for the GPU vertex cache",
+        default = False)
+    simplify_animations: BoolProperty(name = "Simplify Animations",
+        description = "Remove animation keys (and constant curves) that make no visible difference",
+        default = False)
+    merge_materials: BoolProperty(name = "Merge Materials",
+        description = "Merge materials with the same shader and properties, whatever their names (breaks lookups by material name)",
+        default = False)
 
     @classmethod
     def poll(cls, context):
@@ -74,6 +86,15 @@ class KSPMU_OT_ExportMu_quick(bpy.types.Operator, ExportHelper):
 
     filename_ext = ".mu"
     filter_glob: StringProperty(default="*.mu", options={'HIDDEN'})
+    optimize_vertex_cache: BoolProperty(name = "Optimize Vertex Cache",
+        description = "Reorder triangles and vertices for the GPU vertex cache",
+        default = False)
+    simplify_animations: BoolProperty(name = "Simplify Animations",
+        description = "Remove animation keys (and constant curves) that make no visible difference",
+        default = False)
+    merge_materials: BoolProperty(name = "Merge Materials",
+        description = "Merge materials with the same shader and properties, whatever their names (breaks lookups by material name)",
+        default = False)
 
     @classmethod
     def poll(cls, context):
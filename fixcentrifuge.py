@@ -46,7 +46,7 @@ def check_obj(obj):
 
 fname = "centrifuge.mu"
 mu = Mu()
-if not mu.read(fname):
+if not mu.read(fname, lazy=True):
     print("could not read: " + fname)
     raise
 check_obj(mu.obj)
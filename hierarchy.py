@@ -70,7 +70,7 @@ def check_obj(obj, parent, level = 0):
 
 for fname in sys.argv[1:]:
     mu = Mu()
-    if not mu.read(fname):
+    if not mu.scan(fname):
         print("could not read: " + fname)
         raise
     check_obj(mu.obj, Transform((0,0,0), (1,0,0,0), (1,1,1)))
@@ -46,13 +46,17 @@ def make_mesh(mesh, hull):
     mumesh.submeshes = [tris]
     return mumesh
 
+# collider mesh fingerprint to hull mesh: identical colliders are hulled once
+hull_cache = {}
+
 def find_colliders(obj, level=0):
     if hasattr(obj, "collider") and isinstance(obj.collider, MuColliderMesh):
-        m=obj.collider.mesh
-        qh = QuickHull(obj.collider.mesh)
-        hull = qh.GetHull()
-        obj.collider.mesh = make_mesh(obj.collider.mesh, hull)
-        m=obj.collider.mesh
+        key = obj.collider.mesh.fingerprint()
+        if key not in hull_cache:
+            qh = QuickHull(obj.collider.mesh)
+            hull = qh.GetHull()
+            hull_cache[key] = make_mesh(obj.collider.mesh, hull)
+        obj.collider.mesh = hull_cache[key]
     for child in obj.children:
         find_colliders(child, level+1)
 
@@ -63,7 +67,7 @@ def main():
     fname = sys.argv[1]
     oname = sys.argv[2]
     mu = Mu()
-    if not mu.read(fname):
+    if not mu.read(fname, lazy=True):
         print("could not read: " + fname)
         sys.exit(1)
     find_colliders(mu.obj)
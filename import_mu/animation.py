@@ -229,18 +229,12 @@ def create_action(mu, path, clip):
         track.strips.new(act.name, 1, act)
 
 def create_object_paths(mu):
-    def recurse (mu, obj, parent_names, parent):
-        obj.parent = parent
+    hierarchy = mu.hierarchy()
+    for obj, parent, path in zip(hierarchy.objects, hierarchy.parents,
+                                 hierarchy.paths):
+        obj.parent = hierarchy.objects[parent] if parent >= 0 else None
         obj.mu = mu
-        name = obj.transform.name
-        parent_names.append(name)
-        obj.path = "/".join(parent_names)
-        mu.objects[name] = obj
-        mu.object_paths[obj.path] = obj
-        for child in obj.children:
-            recurse(mu, child, parent_names, obj)
-        parent_names.pop()
-    mu.objects = {}
-    mu.object_paths = {}
+        obj.path = path
+    mu.objects = dict(hierarchy.by_name)
+    mu.object_paths = dict(hierarchy.by_path)
     mu.bad_paths = set()
-    recurse(mu, mu.obj, [], None)
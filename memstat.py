@@ -0,0 +1,81 @@
+# vim:ts=4:et
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Report the memory used by loading .mu files: peak RSS, traced python
+# allocations and the number of live objects of each type created by the
+# load. Run against different revisions of mu.py to compare.
+#   python3 memstat.py model.mu [model2.mu ...]
+
+from mu import Mu
+from collections import Counter
+import gc
+import sys
+import time
+import tracemalloc
+try:
+    import resource     # not available on Windows
+except ImportError:
+    resource = None
+
+def count_objects():
+    gc.collect()
+    return Counter(type(o).__name__ for o in gc.get_objects())
+
+def peak_rss():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss //= 1024    # bytes on macOS, KiB elsewhere
+    return rss
+
+def main():
+    if len(sys.argv) < 2:
+        print("memstat.py <mu-file> [mu-file ...]")
+        sys.exit(1)
+    rss = peak_rss()
+    before = count_objects()
+    tracemalloc.start()
+    start = time.perf_counter()
+    models = []
+    for fname in sys.argv[1:]:
+        mu = Mu()
+        if not mu.read(fname):
+            print("could not read: " + fname)
+            sys.exit(1)
+        models.append(mu)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    after = count_objects()
+    after.subtract(before)
+    print("files:           %d" % len(models))
+    print("load time:       %.3fs" % elapsed)
+    if rss is not None:
+        print("peak RSS:        %d KiB (%+d KiB)"
+              % (peak_rss(), peak_rss() - rss))
+    print("python memory:   %d KiB held, %d KiB peak"
+          % (current // 1024, peak // 1024))
+    print("objects created:")
+    for name, count in after.most_common(15):
+        if count > 0:
+            print("    %-24s %d" % (name, count))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# vim:ts=4:et
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Merge duplicate materials and textures in .mu files, remapping the
+# renderers that use them.
+#   python3 mergematerials.py [-n] [-o output.mu] model.mu [model2.mu ...]
+
+from rewrite import parse_args, rewrite_models
+
+def merge(path, mu):
+    num_materials, num_textures = len(mu.materials), len(mu.textures)
+    materials, textures = mu.merge_materials()
+    print("%s: materials %d -> %d, textures %d -> %d"
+          % (path, num_materials, num_materials - materials,
+             num_textures, num_textures - textures))
+    return materials or textures
+
+def main():
+    opts, args = parse_args("mergematerials.py [-n] [-o output.mu] "
+                            "<mu-file> [mu-file ...]")
+    rewrite_models(opts, args, merge, lazy=True)
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,20 @@
 
 # <pep8 compliant>
 
-from struct import pack, unpack
+from struct import pack, unpack, Struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain, compress, islice, repeat
+from math import isfinite, sqrt
+from operator import neg, not_
+from time import perf_counter
+import hashlib
+import importlib
+import io
+import json
+import mmap
+import os
+import sys
 
 class MuEnum:
     MODEL_BINARY = 76543
@@ -165,7 +178,37 @@ class MuEnum:
         'TT_NORMAL_MAP':TT_NORMAL_MAP,
     }
 
+class MuLayout:
+    # precompiled struct layouts for scalars and fixed-size records
+    uint8 = Struct("<B")
+    int32 = Struct("<i")
+    uint32 = Struct("<I")
+    float32 = Struct("<f")
+    vector = Struct("<3f")
+    quaternion = Struct("<4f")
+    key = Struct("<4fi")                # time, value, in, out, tangentMode
+    bone_weight = Struct("<ifififif")   # (index, weight) * 4
+    transform = Struct("<10f")          # position, rotation, scale
+    mattex = Struct("<i4f")             # index, scale, offset
+
+class MuLazy:
+    # record whose decoding Mu.read(lazy=True) defers to first use
+    def __getattr__(self, name):
+        # only reached when normal attribute lookup fails
+        if name[:2] == "__" or "_lazy" not in self.__dict__:
+            raise AttributeError(name)
+        self.materialize()
+        return getattr(self, name)
+    def materialize(self):
+        if "_lazy" in self.__dict__:
+            reader, offset, length = self.__dict__.pop("_lazy")
+            self.__init__()
+            reader.file.seek(offset)
+            self.read(reader)
+        return self
+
 class MuTexture:
+    __slots__ = ("name", "type", "index")
     def __init__(self):
         pass
     def read(self, mu):
@@ -179,6 +222,7 @@ class MuTexture:
         mu.write_int(self.type)
 
 class MuMatTex:
+    __slots__ = ("index", "scale", "offset")
     def __init__(self):
         pass
     def read(self, mu):
@@ -188,9 +232,9 @@ class MuMatTex:
         self.offset = mu.read_float(2)
         return self
     def write(self, mu):
-        mu.write_int(self.index)
-        mu.write_float(self.scale)
-        mu.write_float(self.offset)
+        mu.write_struct(MuLayout.mattex, self.index,
+                        self.scale[0], self.scale[1],
+                        self.offset[0], self.offset[1])
 
 def read_material4(self, mu):
     self.name = mu.read_string()
@@ -327,8 +371,11 @@ class MuMaterial:
             mu.write_string(k)
             mu.write_int(4)
             self.textureProperties[k].write(mu)
+    def fingerprint(self):
+        return fingerprint(self)
 
 class MuTransform:
+    __slots__ = ("name", "localPosition", "localRotation", "localScale")
     def __init__(self):
         pass
     def read(self, mu):
@@ -341,12 +388,18 @@ class MuTransform:
         #      self.localScale)
         return self
     def write(self, mu):
+        p = self.localPosition
+        q = self.localRotation
+        s = self.localScale
         mu.write_string(self.name)
-        mu.write_vector(self.localPosition)
-        mu.write_quaternion(self.localRotation)
-        mu.write_vector(self.localScale)
+        # same conversions as write_vector and write_quaternion
+        mu.write_struct(MuLayout.transform,
+                        p[0], p[2], p[1],
+                        -q[1], -q[3], -q[2], q[0],
+                        s[0], s[2], s[1])
 
 class MuTagLayer:
+    __slots__ = ("tag", "layer")
     def __init__(self):
         pass
     def read(self, mu):
@@ -361,6 +414,7 @@ class MuTagLayer:
         mu.write_int(self.layer)
 
 class MuKey:
+    __slots__ = ("time", "value", "tangent", "tangentMode")
     def __init__(self):
         pass
     def read(self, mu):
@@ -373,12 +427,207 @@ class MuKey:
         #print("   ", self.time, self.value, self.tangent, self.tangentMode)
         return self
     def write(self, mu):
-        mu.write_float(self.time)
-        mu.write_float(self.value)
-        mu.write_float(self.tangent)
-        mu.write_int(self.tangentMode)
+        mu.write_struct(MuLayout.key, self.time, self.value,
+                        self.tangent[0], self.tangent[1], self.tangentMode)
+
+class MuKeyView:
+    # MuKey-like view of one key in MuKeys
+    __slots__ = ("_keys", "_index")
+    def __init__(self, keys, index):
+        self._keys = keys
+        self._index = index
+    @property
+    def time(self):
+        return self._keys.time[self._index]
+    @time.setter
+    def time(self, time):
+        self._keys.time[self._index] = time
+    @property
+    def value(self):
+        return self._keys.value[self._index]
+    @value.setter
+    def value(self, value):
+        self._keys.value[self._index] = value
+    @property
+    def tangent(self):
+        return (self._keys.inTangent[self._index],
+                self._keys.outTangent[self._index])
+    @tangent.setter
+    def tangent(self, tangent):
+        self._keys.inTangent[self._index] = tangent[0]
+        self._keys.outTangent[self._index] = tangent[1]
+    @property
+    def tangentMode(self):
+        return self._keys.tangentMode[self._index]
+    @tangentMode.setter
+    def tangentMode(self, tangentMode):
+        self._keys.tangentMode[self._index] = tangentMode
+    def write(self, mu):
+        MuKey.write(self, mu)
+
+class MuKeys:
+    # columnar keys of a MuCurve, read and written in one block
+    def __init__(self):
+        self.time = array("f")
+        self.value = array("f")
+        self.inTangent = array("f")
+        self.outTangent = array("f")
+        self.tangentMode = array("i")
+    def __len__(self):
+        return len(self.time)
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [MuKeyView(self, i)
+                    for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("key index out of range")
+        return MuKeyView(self, index)
+    def __iter__(self):
+        for i in range(len(self)):
+            yield MuKeyView(self, i)
+    def __delitem__(self, index):
+        del self.time[index]
+        del self.value[index]
+        del self.inTangent[index]
+        del self.outTangent[index]
+        del self.tangentMode[index]
+    def append(self, key):
+        self.time.append(key.time)
+        self.value.append(key.value)
+        self.inTangent.append(key.tangent[0])
+        self.outTangent.append(key.tangent[1])
+        self.tangentMode.append(key.tangentMode)
+    def read(self, mu, num_keys):
+        # work on the raw 32-bit words so the float columns and the
+        # tangentMode column are split without any conversion
+        data = mu.read_array("i", num_keys * 5)
+        columns = []
+        for i in range(4):
+            col = array("f")
+            col.frombytes(data[i::5].tobytes())
+            columns.append(col)
+        self.time, self.value, self.inTangent, self.outTangent = columns
+        self.tangentMode = data[4::5]
+        return self
+    def write(self, mu):
+        data = array("i", bytes(len(self) * 5 * 4))
+        for i, col in enumerate((self.time, self.value,
+                                 self.inTangent, self.outTangent)):
+            if col.typecode != "f":
+                col = array("f", col)
+            bits = array("i")
+            bits.frombytes(col.tobytes())
+            data[i::5] = bits
+        data[4::5] = array("i", self.tangentMode)
+        mu.write_array(data)
+
+# default tolerance (in the curve's units) for MuCurve.simplify
+KEY_TOLERANCE = 1e-4
+
+def hermite(t0, v0, m0, t1, v1, m1, t):
+    # Unity's curve between two keys: a cubic Hermite segment using the
+    # first key's out tangent and the second key's in tangent
+    dt = t1 - t0
+    s = (t - t0) / dt
+    s2 = s * s
+    s3 = s2 * s
+    return ((2 * s3 - 3 * s2 + 1) * v0 + (s3 - 2 * s2 + s) * dt * m0
+            + (3 * s2 - 2 * s3) * v1 + (s3 - s2) * dt * m1)
+
+def key_columns(keys):
+    # (time, value, inTangent, outTangent, tangentMode) of MuKeys or a list
+    # of MuKey
+    if isinstance(keys, MuKeys):
+        return (keys.time, keys.value, keys.inTangent, keys.outTangent,
+                keys.tangentMode)
+    return ([k.time for k in keys], [k.value for k in keys],
+            [k.tangent[0] for k in keys], [k.tangent[1] for k in keys],
+            [k.tangentMode for k in keys])
+
+def curve_samples(time, value, inTangent, outTangent, first, last):
+    # (time, value) of the curve at each key from first to last and halfway
+    # between them, or None if a segment can't be evaluated (stepped keys)
+    samples = [(time[first], value[first])]
+    for j in range(first, last):
+        t0, t1 = time[j], time[j + 1]
+        m0, m1 = outTangent[j], inTangent[j + 1]
+        if not (t1 > t0 and isfinite(m0) and isfinite(m1)):
+            return None
+        t = (t0 + t1) / 2
+        samples.append((t, hermite(t0, value[j], m0, t1, value[j + 1], m1, t)))
+        samples.append((t1, value[j + 1]))
+    return samples
+
+def reduce_keys(time, value, inTangent, outTangent, tolerance):
+    # indices of the keys to keep: from each kept key, the segment reaches
+    # the furthest key it can while staying within tolerance of the original
+    # curve at every key and halfway between keys
+    num_keys = len(time)
+    if num_keys < 3:
+        return list(range(num_keys))
+    def fits(first, last):
+        samples = curve_samples(time, value, inTangent, outTangent,
+                                first, last)
+        if samples is None:
+            return False
+        t0, v0, m0 = time[first], value[first], outTangent[first]
+        t1, v1, m1 = time[last], value[last], inTangent[last]
+        return all(abs(hermite(t0, v0, m0, t1, v1, m1, t) - v) <= tolerance
+                   for t, v in samples)
+    kept = [0]
+    anchor = 0
+    while anchor < num_keys - 1:
+        # gallop, then bisect, for the furthest key the segment can reach
+        # (assuming it can reach the nearer ones too)
+        good = anchor + 1
+        step = 1
+        while good + step < num_keys and fits(anchor, good + step):
+            good += step
+            step *= 2
+        bad = min(good + step, num_keys)
+        while bad - good > 1:
+            mid = (good + bad) // 2
+            if fits(anchor, mid):
+                good = mid
+            else:
+                bad = mid
+        kept.append(good)
+        anchor = good
+    return kept
+
+# transform curve properties: the MuTransform attribute, index and sign
+# giving the rest value (see MuTransform.write)
+transform_properties = {
+    "m_LocalPosition.x": ("localPosition", 0, 1),
+    "m_LocalPosition.y": ("localPosition", 2, 1),
+    "m_LocalPosition.z": ("localPosition", 1, 1),
+    "m_LocalRotation.w": ("localRotation", 0, 1),
+    "m_LocalRotation.x": ("localRotation", 1, -1),
+    "m_LocalRotation.y": ("localRotation", 3, -1),
+    "m_LocalRotation.z": ("localRotation", 2, -1),
+    "m_LocalScale.x": ("localScale", 0, 1),
+    "m_LocalScale.y": ("localScale", 2, 1),
+    "m_LocalScale.z": ("localScale", 1, 1),
+}
+
+def holds_rest_value(tree, index, curve, tolerance):
+    # True if curve (on the animation of tree.objects[index], a MuHierarchy)
+    # is a transform curve holding the transform's own value throughout
+    if curve.type != 0 or curve.property not in transform_properties:
+        return False
+    path = tree.paths[index]
+    if curve.path:
+        path += "/" + curve.path
+    obj = tree.by_path.get(path)
+    if obj is None:
+        return False
+    attr, i, sign = transform_properties[curve.property]
+    return curve.holds(sign * getattr(obj.transform, attr)[i], tolerance)
 
 class MuCurve:
+    __slots__ = ("path", "property", "type", "wrapMode", "keys")
     def __init__(self):
         pass
     def read(self, mu):
@@ -402,9 +651,7 @@ class MuCurve:
         else:
             num_keys = mu.read_int()
         #print(num_keys)
-        self.keys = []
-        for i in range(num_keys):
-            self.keys.append(MuKey().read(mu))
+        self.keys = MuKeys().read(mu, num_keys)
         return self
     def write(self, mu):
         mu.write_string(self.path)
@@ -412,8 +659,32 @@ class MuCurve:
         mu.write_int(self.type)
         mu.write_int(self.wrapMode)
         mu.write_int(len(self.keys))
-        for key in self.keys:
-            key.write(mu)
+        if isinstance(self.keys, MuKeys):
+            self.keys.write(mu)
+        else:
+            for key in self.keys:
+                key.write(mu)
+    def simplify(self, tolerance=KEY_TOLERANCE):
+        # drop keys the Hermite segments reproduce; returns the count
+        columns = key_columns(self.keys)
+        kept = reduce_keys(*columns[:4], tolerance)
+        removed = len(self.keys) - len(kept)
+        if removed:
+            keys = MuKeys()
+            keys.time, keys.value, keys.inTangent, keys.outTangent = [
+                array("f", map(col.__getitem__, kept)) for col in columns[:4]]
+            keys.tangentMode = array("i", map(columns[4].__getitem__, kept))
+            self.keys = keys
+        return removed
+    def holds(self, value, tolerance=KEY_TOLERANCE):
+        # True if the curve stays within tolerance of value throughout
+        if not len(self.keys):
+            return False
+        columns = key_columns(self.keys)
+        samples = curve_samples(*columns[:4], 0, len(self.keys) - 1)
+        if samples is None:
+            return False
+        return all(abs(v - value) <= tolerance for t, v in samples)
 
 class MuClip:
     def __init__(self):
@@ -437,8 +708,10 @@ class MuClip:
         mu.write_int(len(self.curves))
         for curve in self.curves:
             curve.write(mu)
+    def fingerprint(self):
+        return fingerprint(self)
 
-class MuAnimation:
+class MuAnimation(MuLazy):
     def __init__(self):
         self.clips = []
     def read(self, mu):
@@ -451,6 +724,8 @@ class MuAnimation:
         #print(self.clip, self.autoPlay)
         return self
     def write(self, mu):
+        if mu.write_raw(self, MuEnum.ET_ANIMATION):
+            return
         mu.write_int(MuEnum.ET_ANIMATION)
         mu.write_int(len(self.clips))
         for clip in self.clips:
@@ -459,6 +734,7 @@ class MuAnimation:
         mu.write_byte(self.autoPlay)  #XXX is this right?
 
 class MuBoneWeight:
+    __slots__ = ("indices", "weights")
     def __init__(self):
         self.indices = []
         self.weights = []
@@ -468,11 +744,325 @@ class MuBoneWeight:
             self.weights.append(mu.read_float())
         return self
     def write(self, mu):
-        for i in range(4):
-            mu.write_int(self.indices[i])
-            mu.write_float(self.weights[i])
+        i = self.indices
+        w = self.weights
+        mu.write_struct(MuLayout.bone_weight,
+                        i[0], w[0], i[1], w[1], i[2], w[2], i[3], w[3])
+
+def swizzle(data, width, order, negate=()):
+    # permute (order: source of each column) and negate columns
+    out = array(data.typecode, bytes(len(data) * data.itemsize))
+    for dst, src in enumerate(order):
+        out[dst::width] = data[src::width]
+    for col in negate:
+        out[col::width] = array(data.typecode, map(neg, out[col::width]))
+    return out
+
+def indices_in_range(indices, num_verts):
+    # viewed as unsigned, negative indices are out of range too, so one max
+    # covers both ends
+    return not indices or max(array("I", indices.tobytes())) < num_verts
+
+def check_indices(indices, num_verts):
+    if not indices_in_range(indices, num_verts):
+        raise ValueError("MuMesh: triangle index out of range (%d vertices)"
+                         % num_verts)
+
+class MuArray:
+    # flat per-vertex values; indexing and iteration yield tuples
+    def __init__(self, width, data=None, typecode="f"):
+        if data is None:
+            data = array(typecode)
+        self.width = width
+        self.data = data
+    def __len__(self):
+        return len(self.data) // self.width
+    def __iter__(self):
+        d, w = self.data, self.width
+        return zip(*[d[i::w] for i in range(w)])
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        w = self.width
+        return tuple(self.data[index * w:(index + 1) * w])
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += len(self)
+        w = self.width
+        self.data[index * w:(index + 1) * w] = array(self.data.typecode, value)
+    def column(self, index):
+        return self.data[index::self.width]
+    def tolist(self):
+        return list(self)
+
+def chunked(iterable, size=65536):
+    # split a (possibly huge) iterable into lists of at most size items
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+class MuStream:
+    # per-vertex values from chunks() (repeatable) as they are written
+    def __init__(self, count, width, chunks):
+        self.count = count
+        self.width = width
+        self.chunks = chunks
+    def __len__(self):
+        return self.count
+    def __iter__(self):
+        width = self.width
+        for chunk in self.flat("d"):
+            for i in range(0, len(chunk), width):
+                yield tuple(chunk[i:i + width])
+    def flat(self, typecode="f"):
+        # the chunks as flat arrays
+        for chunk in self.chunks():
+            if isinstance(chunk, MuArray):
+                chunk = chunk.data
+            if not isinstance(chunk, array) or chunk.typecode != typecode:
+                if len(chunk) and hasattr(chunk[0], "__len__"):
+                    chunk = chain.from_iterable(chunk)
+                chunk = array(typecode, chunk)
+            yield chunk
+
+def vertex_bounds(verts):
+    # axis aligned bounds ((min x, y, z), (max x, y, z)) of a MuArray,
+    # MuStream or sequence of vertices, None when there are no vertices
+    if isinstance(verts, MuStream):
+        chunks = (MuArray(3, chunk) for chunk in verts.flat("f"))
+    else:
+        chunks = (verts,)
+    bounds = None
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        if isinstance(chunk, MuArray):
+            columns = [chunk.column(i) for i in range(3)]
+        else:
+            columns = list(zip(*chunk))[:3]
+        mins = tuple(map(min, columns))
+        maxs = tuple(map(max, columns))
+        if bounds:
+            mins = tuple(map(min, bounds[0], mins))
+            maxs = tuple(map(max, bounds[1], maxs))
+        bounds = mins, maxs
+    return bounds
+
+def pad4(values):
+    values = list(values)[:4]
+    return values + [0] * (4 - len(values))
+
+class MuBoneWeightView:
+    # MuBoneWeight-like view of one vertex in MuBoneWeights
+    __slots__ = ("_weights", "_index")
+    def __init__(self, weights, index):
+        self._weights = weights
+        self._index = index
+    @property
+    def indices(self):
+        i = self._index * 4
+        return tuple(self._weights.indices[i:i + 4])
+    @indices.setter
+    def indices(self, indices):
+        # always exactly four entries (zero padded, extras dropped) so the
+        # other vertices in the shared arrays do not shift
+        i = self._index * 4
+        self._weights.indices[i:i + 4] = array("i", pad4(indices))
+    @property
+    def weights(self):
+        i = self._index * 4
+        return tuple(self._weights.weights[i:i + 4])
+    @weights.setter
+    def weights(self, weights):
+        i = self._index * 4
+        self._weights.weights[i:i + 4] = array("f", pad4(weights))
+    def write(self, mu):
+        MuBoneWeight.write(self, mu)
 
-class MuMesh:
+class MuBoneWeights:
+    # bone weights as flat index and weight arrays, four per vertex
+    def __init__(self, count=0):
+        self.indices = array("i", bytes(count * 16))
+        self.weights = array("f", bytes(count * 16))
+    def __len__(self):
+        return len(self.indices) // 4
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [MuBoneWeightView(self, i)
+                    for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("bone weight index out of range")
+        return MuBoneWeightView(self, index)
+    def __iter__(self):
+        for i in range(len(self)):
+            yield MuBoneWeightView(self, i)
+    def tolist(self):
+        indices, weights = self.indices, self.weights
+        bws = [None] * len(self)
+        for i in range(len(self)):
+            bw = bws[i] = MuBoneWeight()
+            bw.indices = list(indices[i * 4:i * 4 + 4])
+            bw.weights = list(weights[i * 4:i * 4 + 4])
+        return bws
+    def read(self, mu, num_verts):
+        # split on the raw 32-bit words: even words are indices, odd words
+        # are weights
+        data = mu.read_array("i", num_verts * 8)
+        self.indices = data[0::2]
+        self.weights = array("f")
+        self.weights.frombytes(data[1::2].tobytes())
+        return self
+    def write(self, mu):
+        data = array("i", bytes(len(self) * 32))
+        data[0::2] = array("i", self.indices)
+        weights = self.weights
+        if weights.typecode != "f":
+            weights = array("f", weights)
+        bits = array("i")
+        bits.frombytes(weights.tobytes())
+        data[1::2] = bits
+        mu.write_array(data)
+
+def make_bone_weights(boneWeights):
+    if isinstance(boneWeights, MuBoneWeights):
+        return boneWeights
+    bws = MuBoneWeights()
+    bws.indices = array("i", chain.from_iterable(bw.indices[:4]
+                                                 for bw in boneWeights))
+    bws.weights = array("f", chain.from_iterable(bw.weights[:4]
+                                                 for bw in boneWeights))
+    if len(bws.indices) != len(boneWeights) * 4:
+        raise ValueError("expected 4 bone weights per vertex")
+    return bws
+
+# entries in the FIFO post-transform vertex cache assumed by tipsify and acmr
+VERTEX_CACHE_SIZE = 24
+
+# MuMesh attributes holding one entry per vertex, besides verts
+vertex_attributes = ["uvs", "uv2s", "normals", "tangents", "boneWeights",
+                     "colors"]
+
+def acmr(submeshes, cache_size=VERTEX_CACHE_SIZE):
+    # average cache miss ratio: vertices transformed per triangle with a
+    # FIFO cache of cache_size entries, flushed between submeshes
+    misses = 0
+    num_tris = 0
+    for tris in submeshes:
+        stamp = {}
+        for tri in tris:
+            for v in tri:
+                if misses - stamp.get(v, -cache_size) >= cache_size:
+                    stamp[v] = misses
+                    misses += 1
+        num_tris += len(tris)
+    return misses / num_tris if num_tris else 0.0
+
+def tipsify(tris, num_verts, cache_size=VERTEX_CACHE_SIZE):
+    # Tipsify (Sander, Nehab and Barczak, 2007) order for a FIFO cache
+    tris = list(tris)
+    adjacent = [[] for i in range(num_verts)]
+    for t, tri in enumerate(tris):
+        for v in tri:
+            adjacent[v].append(t)
+    live = list(map(len, adjacent))
+    stamp = [0] * num_verts
+    emitted = [False] * len(tris)
+    dead_end = []
+    order = []
+    time = cache_size + 1
+    cursor = 0
+    fan = 0 if num_verts else -1
+    while fan >= 0:
+        candidates = []
+        for t in adjacent[fan]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            order.append(tris[t])
+            for v in tris[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time - stamp[v] > cache_size:
+                    stamp[v] = time
+                    time += 1
+        fan = -1
+        best = -1
+        for v in candidates:
+            if live[v]:
+                # prefer the vertex that entered the cache earliest, as long
+                # as its remaining triangles won't push it out
+                priority = 0
+                if time - stamp[v] + 2 * live[v] <= cache_size:
+                    priority = time - stamp[v]
+                if priority > best:
+                    best = priority
+                    fan = v
+        while fan < 0 and dead_end:
+            v = dead_end.pop()
+            if live[v]:
+                fan = v
+        while fan < 0 and cursor < num_verts:
+            if live[cursor]:
+                fan = cursor
+            else:
+                cursor += 1
+    return order
+
+def first_use_order(submeshes, num_verts):
+    # map old vertex numbers to new ones in order of first use by the
+    # triangles, followed by any vertices no triangle uses; also returns the
+    # number of vertices used
+    remap = [-1] * num_verts
+    count = 0
+    for tris in submeshes:
+        for tri in tris:
+            for v in tri:
+                if remap[v] < 0:
+                    remap[v] = count
+                    count += 1
+    used = count
+    for v in range(num_verts):
+        if remap[v] < 0:
+            remap[v] = count
+            count += 1
+    return remap, used
+
+def permute(attr, order):
+    # per-vertex attr (list, MuArray or MuBoneWeights) with its entries in
+    # the given order (of old indices)
+    if isinstance(attr, MuBoneWeights):
+        bws = MuBoneWeights()
+        bws.indices = permute(MuArray(4, attr.indices), order).data
+        bws.weights = permute(MuArray(4, attr.weights), order).data
+        return bws
+    if isinstance(attr, MuArray):
+        width = attr.width
+        data = array(attr.data.typecode, [0]) * (len(order) * width)
+        for i in range(width):
+            data[i::width] = array(data.typecode,
+                                   map(attr.column(i).__getitem__, order))
+        return MuArray(width, data)
+    return [attr[i] for i in order]
+
+class MuMesh(MuLazy):
+    # bytes per vertex for each per-vertex block
+    vertex_sizes = {
+        MuEnum.ET_MESH_VERTS: 12,
+        MuEnum.ET_MESH_UV: 8,
+        MuEnum.ET_MESH_UV2: 8,
+        MuEnum.ET_MESH_NORMALS: 12,
+        MuEnum.ET_MESH_TANGENTS: 16,
+        MuEnum.ET_MESH_BONE_WEIGHTS: 32,
+        MuEnum.ET_MESH_VERTEX_COLORS: 4,
+    }
     def __init__(self):
         self.verts = []
         self.uvs = []
@@ -483,6 +1073,105 @@ class MuMesh:
         self.bindPoses = []
         self.submeshes = []
         self.colors = []
+    @property
+    def verts(self):
+        return self._verts
+    @verts.setter
+    def verts(self, verts):
+        # replacing the vertices invalidates the cached bounds
+        self._verts = verts
+        self._bounds = None
+        self._sphere = None
+    def bounds(self):
+        # (mins, maxs) of the vertices or None, cached until verts is set
+        if self._bounds is None:
+            self._bounds = vertex_bounds(self.verts)
+        return self._bounds
+    def sphere(self):
+        # bounding sphere (center, radius) around the bounds' center
+        if self._sphere is None:
+            bounds = self.bounds()
+            if bounds is None:
+                return None
+            cx, cy, cz = center = tuple((a + b) / 2 for a, b in zip(*bounds))
+            r2 = max((x - cx)**2 + (y - cy)**2 + (z - cz)**2
+                     for x, y, z in self.verts)
+            self._sphere = center, sqrt(r2)
+        return self._sphere
+    def select_vertices(self, order):
+        # keep only the vertices (old indices) in order, in that order,
+        # along with their attributes; the triangles are left to the caller
+        num_verts = len(self.verts)
+        self.verts = permute(self.verts, order)
+        for name in vertex_attributes:
+            attr = getattr(self, name)
+            if len(attr) == num_verts:
+                setattr(self, name, permute(attr, order))
+    def compact(self):
+        # weld identical vertices and drop unused ones; returns the count
+        num_verts = len(self.verts)
+        used = bytearray(num_verts)
+        for tris in self.submeshes:
+            for tri in tris:
+                for v in tri:
+                    used[v] = 1
+        count = sum(used)
+        if not count:
+            return 0
+        if (count < num_verts and not num_verts % count
+                and not any(used[count:])):
+            # shape keys: the vertices after the first count are key data
+            return 0
+        columns = [self.verts]
+        for name in vertex_attributes:
+            attr = getattr(self, name)
+            if len(attr) != num_verts:
+                continue
+            if name == "boneWeights":
+                attr = make_bone_weights(attr)
+                columns.append(MuArray(4, attr.indices))
+                columns.append(MuArray(4, attr.weights))
+            else:
+                columns.append(attr)
+        remap = [-1] * num_verts
+        order = []
+        seen = {}
+        for v, key in enumerate(zip(*columns)):
+            if used[v]:
+                remap[v] = index = seen.setdefault(key, len(order))
+                if index == len(order):
+                    order.append(v)
+        if len(order) < num_verts:
+            self.select_vertices(order)
+        for i, tris in enumerate(self.submeshes):
+            remapped = [(remap[a], remap[b], remap[c]) for a, b, c in tris]
+            remapped = [tri for tri in remapped
+                        if tri[0] != tri[1] != tri[2] != tri[0]]
+            if isinstance(tris, MuArray):
+                data = array("i", chain.from_iterable(remapped))
+                remapped = MuArray(3, data)
+            self.submeshes[i] = remapped
+        return num_verts - len(order)
+    def optimize_vertex_cache(self, cache_size=VERTEX_CACHE_SIZE):
+        # tipsify, then number vertices by first use; returns ACMRs
+        before = acmr(self.submeshes, cache_size)
+        num_verts = len(self.verts)
+        submeshes = [tipsify(tris, num_verts, cache_size)
+                     for tris in self.submeshes]
+        remap, used = first_use_order(submeshes, num_verts)
+        if used == num_verts:
+            order = [0] * num_verts
+            for old, new in enumerate(remap):
+                order[new] = old
+            self.select_vertices(order)
+            submeshes = [[(remap[a], remap[b], remap[c]) for a, b, c in tris]
+                         for tris in submeshes]
+        for i, tris in enumerate(self.submeshes):
+            if isinstance(tris, MuArray):
+                data = array("i", chain.from_iterable(submeshes[i]))
+                submeshes[i] = MuArray(3, data)
+        self.submeshes = submeshes
+        return before, acmr(self.submeshes, cache_size)
     def read(self, mu):
         #print("MuMesh")
         start = mu.read_int()
@@ -490,108 +1179,178 @@ class MuMesh:
             raise
         num_verts, submesh_count = mu.read_int(2)
         while True:
+            start = mu.profile_start()
+            count = num_verts
             type = mu.read_int()
             if type == MuEnum.ET_MESH_END:
                 break
             elif type == MuEnum.ET_MESH_VERTS:
                 #print("    verts")
-                for i in range(num_verts):
-                    self.verts.append(mu.read_vector())
+                verts = mu.read_attribute(num_verts, 3, (0, 2, 1), arrays=True)
+                bounds = vertex_bounds(verts)
+                self.verts = verts if mu.arrays else verts.tolist()
+                self._bounds = bounds
             elif type == MuEnum.ET_MESH_UV:
                 #print("    uvs")
-                for i in range(num_verts):
-                    self.uvs.append(mu.read_float(2))
+                self.uvs = mu.read_attribute(num_verts, 2, (0, 1))
             elif type == MuEnum.ET_MESH_UV2:
                 #print("    uv2s")
-                for i in range(num_verts):
-                    self.uv2s.append(mu.read_float(2))
+                self.uv2s = mu.read_attribute(num_verts, 2, (0, 1))
             elif type == MuEnum.ET_MESH_NORMALS:
                 #print("    normals")
-                for i in range(num_verts):
-                    self.normals.append(mu.read_vector())
+                self.normals = mu.read_attribute(num_verts, 3, (0, 2, 1))
             elif type == MuEnum.ET_MESH_TANGENTS:
                 #print("    tangents")
-                for i in range(num_verts):
-                    self.tangents.append(mu.read_tangent())
+                self.tangents = mu.read_attribute(num_verts, 4, (0, 2, 1, 3),
+                                                  (3,))
             elif type == MuEnum.ET_MESH_BONE_WEIGHTS:
                 #print("    bone weights")
-                for i in range(num_verts):
-                    self.boneWeights.append(MuBoneWeight().read(mu))
+                self.boneWeights = MuBoneWeights().read(mu, num_verts)
+                if not mu.arrays:
+                    self.boneWeights = self.boneWeights.tolist()
             elif type == MuEnum.ET_MESH_BIND_POSES:
                 #print("    bind poses")
                 num_poses = mu.read_int()
                 for i in range(num_poses):
                     self.bindPoses.append(mu.read_float(16))
+                count = num_poses
             elif type == MuEnum.ET_MESH_TRIANGLES:
                 #print("    sub mesh")
-                num_tris = mu.read_int()
-                tris = []
-                for i in range(int(num_tris / 3)):   #FIXME is this guaranteed?
-                    tri = mu.read_int(3)
-                    #reverse the triangle winding for Blender (because of the
-                    # LHS/RHS swap)
-                    #avoid putting 0 at the end of the list (Blender doesn't
-                    #like that)
-                    if not tri[0]:
-                        tri = tri[0], tri[2], tri[1]
-                    else:
-                        tri = tri[2], tri[1], tri[0]
-                    tris.append(tri)
+                tris = mu.read_triangles(num_verts)
                 self.submeshes.append(tris)
+                count = len(tris)
             elif type == MuEnum.ET_MESH_VERTEX_COLORS:
-                for i in range(num_verts):
-                    colb = mu.read_byte(4)
-                    col = tuple(map (lambda c: c / 255.0, colb))
-                    self.colors.append(col)
+                self.colors = mu.read_colors(num_verts)
             else:
                 raise ValueError("MuMesh %x %d" % (mu.file.tell(), type))
+            mu.profile_stop("read", type, start, count)
         return self
     def write(self, mu):
+        if mu.write_raw(self):
+            return
         mu.write_int(MuEnum.ET_MESH_START)
         mu.write_int(len(self.verts))
         mu.write_int(len(self.submeshes))
 
+        start = mu.profile_start()
         mu.write_int(MuEnum.ET_MESH_VERTS)
-        for v in self.verts:
-            mu.write_vector(v)
+        mu.write_attribute(self.verts, 3, (0, 2, 1))
+        mu.profile_stop("write", MuEnum.ET_MESH_VERTS, start, len(self.verts))
         if len(self.uvs) == len(self.verts):
+            start = mu.profile_start()
             mu.write_int(MuEnum.ET_MESH_UV)
-            for uv in self.uvs:
-                mu.write_float(uv)
+            mu.write_attribute(self.uvs, 2, (0, 1))
+            mu.profile_stop("write", MuEnum.ET_MESH_UV, start, len(self.uvs))
         if len(self.uv2s) == len(self.verts):
+            start = mu.profile_start()
             mu.write_int(MuEnum.ET_MESH_UV2)
-            for uv in self.uv2s:
-                mu.write_float(uv)
+            mu.write_attribute(self.uv2s, 2, (0, 1))
+            mu.profile_stop("write", MuEnum.ET_MESH_UV2, start, len(self.uv2s))
         if len(self.normals) == len(self.verts):
+            start = mu.profile_start()
             mu.write_int(MuEnum.ET_MESH_NORMALS)
-            for n in self.normals:
-                mu.write_vector(n)
+            mu.write_attribute(self.normals, 3, (0, 2, 1))
+            mu.profile_stop("write", MuEnum.ET_MESH_NORMALS, start,
+                            len(self.normals))
         if len(self.tangents) == len(self.verts):
+            start = mu.profile_start()
             mu.write_int(MuEnum.ET_MESH_TANGENTS)
-            for t in self.tangents:
-                mu.write_tangent(t)
+            mu.write_attribute(self.tangents, 4, (0, 2, 1, 3), (3,))
+            mu.profile_stop("write", MuEnum.ET_MESH_TANGENTS, start,
+                            len(self.tangents))
         if len(self.boneWeights) == len(self.verts):
+            start = mu.profile_start()
             mu.write_int(MuEnum.ET_MESH_BONE_WEIGHTS)
-            for bw in self.boneWeights:
-                bw.write(mu)
+            make_bone_weights(self.boneWeights).write(mu)
+            mu.profile_stop("write", MuEnum.ET_MESH_BONE_WEIGHTS, start,
+                            len(self.boneWeights))
         if len(self.bindPoses):
+            start = mu.profile_start()
             mu.write_int(MuEnum.ET_MESH_BIND_POSES)
             mu.write_int(len(self.bindPoses))
             for bp in self.bindPoses:
                 mu.write_float(bp)
+            mu.profile_stop("write", MuEnum.ET_MESH_BIND_POSES, start,
+                            len(self.bindPoses))
         if len(self.colors) == len(self.verts):
+            start = mu.profile_start()
             mu.write_int(MuEnum.ET_MESH_VERTEX_COLORS)
-            for t in self.colors:
-                mu.write_color(t)
+            mu.write_colors(self.colors)
+            mu.profile_stop("write", MuEnum.ET_MESH_VERTEX_COLORS, start,
+                            len(self.colors))
         for sm in self.submeshes:
+            start = mu.profile_start()
             mu.write_int(MuEnum.ET_MESH_TRIANGLES)
-            mu.write_int(len(sm) * 3)
-            for tri in sm:
-                #reverse the triangle winding for Blender (because of the
-                # LHS/RHS swap)
-                tri = tri[0], tri[2], tri[1]
-                mu.write_int(tri)
+            mu.write_triangles(sm, len(self.verts))
+            mu.profile_stop("write", MuEnum.ET_MESH_TRIANGLES, start, len(sm))
         mu.write_int(MuEnum.ET_MESH_END)
+    def fingerprint(self):
+        return fingerprint(self)
+
+class MuMeshInfo:
+    # mesh block summary from skip_mesh: counts only
+    def __init__(self, num_verts):
+        self.num_verts = num_verts
+        self.num_tris = 0
+        self.submeshes = []     # triangle count of each submesh
+        self.num_poses = 0
+        self.blocks = []        # entry types present, in file order
+
+class MuAnimationInfo:
+    # animation block summary from skip_animation
+    def __init__(self):
+        self.clips = []         # clip names
+        self.num_curves = 0
+        self.num_keys = 0
+
+def skip_mesh(mu):
+    start = mu.read_int()
+    if start != MuEnum.ET_MESH_START:
+        raise ValueError("MuMesh %x %d" % (mu.file.tell(), start))
+    num_verts, submesh_count = mu.read_int(2)
+    info = MuMeshInfo(num_verts)
+    while True:
+        type = mu.read_int()
+        if type == MuEnum.ET_MESH_END:
+            break
+        info.blocks.append(type)
+        if type in MuMesh.vertex_sizes:
+            mu.skip(num_verts * MuMesh.vertex_sizes[type])
+        elif type == MuEnum.ET_MESH_BIND_POSES:
+            info.num_poses = mu.read_int()
+            mu.skip(info.num_poses * 64)
+        elif type == MuEnum.ET_MESH_TRIANGLES:
+            num_tris = mu.read_int()
+            mu.skip(num_tris * 4)
+            info.submeshes.append(num_tris // 3)
+            info.num_tris += num_tris // 3
+        else:
+            raise ValueError("MuMesh %x %d" % (mu.file.tell(), type))
+    return info
+
+def skip_animation(mu):
+    info = MuAnimationInfo()
+    num_clips = mu.read_int()
+    for i in range(num_clips):
+        info.clips.append(mu.read_string())
+        mu.skip(12 + 12 + 4)        # lbCenter, lbSize, wrapMode
+        num_curves = mu.read_int()
+        info.num_curves += num_curves
+        for j in range(num_curves):
+            mu.read_string()        # path
+            mu.read_string()        # property
+            type = mu.read_int()
+            wrapMode = mu.read_int(2)
+            if type == 8:
+                # bad PartTools export (see MuCurve.read)
+                num_keys = wrapMode[1]
+            else:
+                num_keys = mu.read_int()
+            mu.skip(num_keys * 20)
+            info.num_keys += num_keys
+    info.clip = mu.read_string()
+    info.autoPlay = mu.read_byte()
+    return info
 
 class MuRenderer:
     def __init__(self):
@@ -627,7 +1386,7 @@ class MuSkinnedMeshRenderer:
         nBones = mu.read_int()
         for i in range(nBones):
             self.bones.append(mu.read_string())
-        self.mesh = MuMesh().read(mu)
+        self.mesh = mu.read_deferred(MuMesh, skip_mesh)
         return self
     def write(self, mu):
         mu.write_int(MuEnum.ET_SKINNED_MESH_RENDERER)
@@ -653,7 +1412,7 @@ class MuColliderMesh(MuCollider_Base):
         if self.has_trigger:
             self.isTrigger = mu.read_byte()
         self.convex = mu.read_byte()
-        self.mesh = MuMesh().read(mu)
+        self.mesh = mu.read_deferred(MuMesh, skip_mesh)
         #print(self.isTrigger, self.convex)
         return self
     def write(self, mu):
@@ -726,6 +1485,7 @@ class MuColliderBox(MuCollider_Base):
         mu.write_vector(self.center)
 
 class MuSpring:
+    __slots__ = ("spring", "damper", "targetPosition")
     def __init__(self):
         pass
     def read(self, mu):
@@ -739,6 +1499,8 @@ class MuSpring:
         mu.write_float(self.targetPosition)
 
 class MuFriction:
+    __slots__ = ("extremumSlip", "extremumValue", "asymptoteSlip",
+                 "asymptoteValue", "stiffness")
     def __init__(self):
         pass
     def read(self, mu):
@@ -913,6 +1675,38 @@ class MuLight:
         mu.write_uint(self.cullingMask)
         mu.write_float(self.spotAngle)
 
+collider_types = {
+    MuEnum.ET_MESH_COLLIDER,
+    MuEnum.ET_SPHERE_COLLIDER,
+    MuEnum.ET_CAPSULE_COLLIDER,
+    MuEnum.ET_BOX_COLLIDER,
+    MuEnum.ET_MESH_COLLIDER2,
+    MuEnum.ET_SPHERE_COLLIDER2,
+    MuEnum.ET_CAPSULE_COLLIDER2,
+    MuEnum.ET_BOX_COLLIDER2,
+    MuEnum.ET_WHEEL_COLLIDER,
+}
+
+def read_component(mu, entry_type):
+    # (attribute name, component) for entry_type, or None
+    if entry_type in collider_types:
+        return "collider", MuCollider(entry_type).read(mu)
+    elif entry_type == MuEnum.ET_MESH_FILTER:
+        return "shared_mesh", mu.read_deferred(MuMesh, skip_mesh)
+    elif entry_type == MuEnum.ET_MESH_RENDERER:
+        return "renderer", MuRenderer().read(mu)
+    elif entry_type == MuEnum.ET_SKINNED_MESH_RENDERER:
+        return "skinned_mesh_renderer", MuSkinnedMeshRenderer().read(mu)
+    elif entry_type == MuEnum.ET_ANIMATION:
+        return "animation", mu.read_deferred(MuAnimation, skip_animation)
+    elif entry_type == MuEnum.ET_CAMERA:
+        return "camera", MuCamera().read(mu)
+    elif entry_type == MuEnum.ET_PARTICLES:
+        return "particles", MuParticles().read(mu)
+    elif entry_type == MuEnum.ET_LIGHT:
+        return "light", MuLight().read(mu)
+    return None
+
 class MuObject:
     def __init__(self, name=""):
         self.name = name
@@ -920,86 +1714,397 @@ class MuObject:
         self.components = []
     def read(self, mu):
         #print("MuObject")
+        offset = mu.file.tell()
+        start = mu.profile_start()
         self.transform = MuTransform().read(mu)
+        mu.profile_stop("read", MuEnum.ET_CHILD_TRANSFORM_START, start)
+        if mu.indexer is not None:
+            mu.indexer.enter(self.transform.name, offset)
         while True:
+            start = mu.profile_start()
             try:
                 entry_type = mu.read_int()
             except EOFError:
                 break
             #print(entry_type, hex(mu.file.tell()))
+            offset = mu.file.tell()
+            count = 1
             if entry_type == MuEnum.ET_CHILD_TRANSFORM_START:
                 self.children.append(MuObject().read(mu))
+                continue
             elif entry_type == MuEnum.ET_CHILD_TRANSFORM_END:
                 break
             elif entry_type == MuEnum.ET_TAG_AND_LAYER:
                 self.tag_and_layer = MuTagLayer().read(mu)
-            elif entry_type in [MuEnum.ET_MESH_COLLIDER,
-                                MuEnum.ET_SPHERE_COLLIDER,
-                                MuEnum.ET_CAPSULE_COLLIDER,
-                                MuEnum.ET_BOX_COLLIDER,
-                                MuEnum.ET_MESH_COLLIDER2,
-                                MuEnum.ET_SPHERE_COLLIDER2,
-                                MuEnum.ET_CAPSULE_COLLIDER2,
-                                MuEnum.ET_BOX_COLLIDER2,
-                                MuEnum.ET_WHEEL_COLLIDER]:
-                self.collider = MuCollider(entry_type).read(mu)
-                self.components.append(self.collider)
-            elif entry_type == MuEnum.ET_MESH_FILTER:
-                self.shared_mesh = MuMesh().read(mu)
-                self.components.append(self.shared_mesh)
-            elif entry_type == MuEnum.ET_MESH_RENDERER:
-                self.renderer = MuRenderer().read(mu)
-                self.components.append(self.renderer)
-            elif entry_type == MuEnum.ET_SKINNED_MESH_RENDERER:
-                self.skinned_mesh_renderer = MuSkinnedMeshRenderer().read(mu)
-                self.components.append(self.skinned_mesh_renderer)
-            elif entry_type == MuEnum.ET_ANIMATION:
-                self.animation = MuAnimation().read(mu)
-                self.components.append(self.animation)
-            elif entry_type == MuEnum.ET_CAMERA:
-                self.camera = MuCamera().read(mu)
-                self.components.append(self.camera)
-            elif entry_type == MuEnum.ET_PARTICLES:
-                self.particles = MuParticles().read(mu)
-                self.components.append(self.particles)
-            elif entry_type == MuEnum.ET_LIGHT:
-                self.light = MuLight().read(mu)
-                self.components.append(self.light)
             elif entry_type == MuEnum.ET_MATERIALS:
                 mat_count = mu.read_int()
                 for i in range(mat_count):
+                    if mu.indexer is not None:
+                        mu.indexer.materials.append(mu.file.tell())
                     mat = MuMaterial().read(mu)
                     mu.materials.append(mat)
+                count = mat_count
             elif entry_type == MuEnum.ET_TEXTURES:
                 tex_count = mu.read_int()
                 for i in range(tex_count):
+                    if mu.indexer is not None:
+                        mu.indexer.textures.append(mu.file.tell())
                     mu.textures.append(MuTexture().read(mu))
+                count = tex_count
             else:
-                #print(entry_type, hex(mu.file.tell()))
-                pass
+                component = read_component(mu, entry_type)
+                if component:
+                    name, component = component
+                    setattr(self, name, component)
+                    self.components.append(component)
+                    if mu.indexer is not None:
+                        mu.indexer.add_component(entry_type, offset,
+                                                 mu.file.tell() - offset)
+                #else:
+                #    print(entry_type, hex(mu.file.tell()))
+            mu.profile_stop("read", entry_type, start, count)
+        if mu.indexer is not None:
+            mu.indexer.leave()
         return self
     def write(self, mu):
-        self.transform.write(mu)
-        self.tag_and_layer.write(mu)
+        mu.write_record(self.transform.write, MuEnum.ET_CHILD_TRANSFORM_START)
+        mu.write_record(self.tag_and_layer.write)
         if hasattr(self, "collider") and self.collider != None:
-            self.collider.write(mu)
+            mu.write_record(self.collider.write)
         if hasattr(self, "shared_mesh") and self.shared_mesh != None:
-            mu.write_int(MuEnum.ET_MESH_FILTER)
-            self.shared_mesh.write(mu)
+            mu.write_record(self.write_shared_mesh)
         if hasattr(self, "renderer") and self.renderer != None:
-            self.renderer.write(mu)
+            mu.write_record(self.renderer.write)
         if hasattr(self, "skinned_mesh_renderer") and self.skinned_mesh_renderer != None:
-            self.skinned_mesh_renderer.write(mu)
+            mu.write_record(self.skinned_mesh_renderer.write)
         if hasattr(self, "animation") and self.animation != None:
-            self.animation.write(mu)
+            mu.write_record(self.animation.write)
         if hasattr(self, "camera") and self.camera != None:
-            self.camera.write(mu)
+            mu.write_record(self.camera.write)
         if hasattr(self, "light") and self.light != None:
-            self.light.write(mu)
+            mu.write_record(self.light.write)
         for child in self.children:
             mu.write_int(MuEnum.ET_CHILD_TRANSFORM_START)
             child.write(mu)
             mu.write_int(MuEnum.ET_CHILD_TRANSFORM_END)
+    def write_shared_mesh(self, mu):
+        mu.write_int(MuEnum.ET_MESH_FILTER)
+        self.shared_mesh.write(mu)
+    def fingerprint(self):
+        return fingerprint(self)
+
+class MuHierarchy:
+    # flattened object tree, parents before children
+    def __init__(self, root):
+        self.root = root
+        self.objects = []
+        self.parents = array("i")
+        self.depths = array("i")
+        self.paths = []
+        stack = [(root, -1)]
+        while stack:
+            obj, parent = stack.pop()
+            index = len(self.objects)
+            path = obj.transform.name
+            depth = 0
+            if parent >= 0:
+                path = self.paths[parent] + "/" + path
+                depth = self.depths[parent] + 1
+            self.objects.append(obj)
+            self.parents.append(parent)
+            self.depths.append(depth)
+            self.paths.append(path)
+            for child in reversed(obj.children):
+                stack.append((child, index))
+        self.by_path = dict(zip(self.paths, self.objects))
+        self.by_name = {obj.transform.name: obj for obj in self.objects}
+        self.indices = {obj: i for i, obj in enumerate(self.objects)}
+        self._world = None
+    @property
+    def world(self):
+        # per object, the top three rows of its world matrix (Blender's
+        # axes) as 12 floats, built on first use
+        if self._world is None:
+            self._world = self.world_matrices()
+        return self._world
+    def world_matrices(self):
+        # gather the local TRS of all objects, then compose every local
+        # matrix with its (already computed) parent's in a single pass
+        loc = array("d")
+        rot = array("d")
+        scale = array("d")
+        for obj in self.objects:
+            xform = obj.transform
+            loc.extend(xform.localPosition)
+            rot.extend(xform.localRotation)
+            scale.extend(xform.localScale)
+        world = array("d", bytes(len(self.objects) * 12 * 8))
+        for i, parent in enumerate(self.parents):
+            tx, ty, tz = loc[i * 3:i * 3 + 3]
+            w, x, y, z = rot[i * 4:i * 4 + 4]
+            sx, sy, sz = scale[i * 3:i * 3 + 3]
+            n = w * w + x * x + y * y + z * z
+            s = 2 / n if n else 0
+            local = (
+                (1 - s * (y * y + z * z)) * sx, s * (x * y - w * z) * sy,
+                s * (x * z + w * y) * sz, tx,
+                s * (x * y + w * z) * sx, (1 - s * (x * x + z * z)) * sy,
+                s * (y * z - w * x) * sz, ty,
+                s * (x * z - w * y) * sx, s * (y * z + w * x) * sy,
+                (1 - s * (x * x + y * y)) * sz, tz,
+            )
+            if parent < 0:
+                world[i * 12:i * 12 + 12] = array("d", local)
+                continue
+            p = world[parent * 12:parent * 12 + 12]
+            m = [0.0] * 12
+            for r in range(3):
+                p0, p1, p2, p3 = p[r * 4:r * 4 + 4]
+                for c in range(4):
+                    m[r * 4 + c] = (p0 * local[c] + p1 * local[4 + c]
+                                    + p2 * local[8 + c])
+                m[r * 4 + 3] += p3
+            world[i * 12:i * 12 + 12] = array("d", m)
+        return world
+    def matrix(self, index):
+        # the 4x4 world matrix of objects[index] as a tuple of rows
+        m = self.world[index * 12:index * 12 + 12]
+        return (tuple(m[0:4]), tuple(m[4:8]), tuple(m[8:12]),
+                (0.0, 0.0, 0.0, 1.0))
+    def world_points(self, index, points):
+        # points (a MuArray or 3-vectors) in the space of objects[index]
+        # as a MuArray of world space points
+        a, b, c, d, e, f, g, h, i, j, k, l = self.world[index * 12:
+                                                        index * 12 + 12]
+        if isinstance(points, MuArray):
+            xyz = list(zip(points.column(0), points.column(1),
+                           points.column(2)))
+        else:
+            xyz = [tuple(p) for p in points]
+        out = array("f", bytes(len(xyz) * 3 * 4))
+        out[0::3] = array("f", [a * x + b * y + c * z + d for x, y, z in xyz])
+        out[1::3] = array("f", [e * x + f * y + g * z + h for x, y, z in xyz])
+        out[2::3] = array("f", [i * x + j * y + k * z + l for x, y, z in xyz])
+        return MuArray(3, out)
+
+# compressed containers (.mu.gz, .mu.xz, .mu.bz2): leading magic bytes and
+# file extensions to compression name, and compression name to module
+compression_magic = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"BZh", "bz2"),
+)
+compression_extensions = {".gz": "gzip", ".xz": "xz", ".bz2": "bz2"}
+compression_modules = {"gzip": "gzip", "xz": "lzma", "bz2": "bz2"}
+
+def compression_of(head):
+    for magic, compression in compression_magic:
+        if head[:len(magic)] == magic:
+            return compression
+    return None
+
+def open_compressed(compression, file, mode):
+    # file may be a path or a file object (which is then not closed along
+    # with the returned file)
+    module = importlib.import_module(compression_modules[compression])
+    return module.open(file, mode)
+
+class MuBuffer:
+    # read-only file over bytes; reads return memoryview slices
+    def __init__(self, data):
+        self.data = memoryview(data).cast("B")
+        self.pos = 0
+    def read(self, size=-1):
+        start = self.pos
+        if size < 0:
+            self.pos = len(self.data)
+        else:
+            self.pos = min(start + size, len(self.data))
+        return self.data[start:self.pos]
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += len(self.data)
+        self.pos = max(offset, 0)
+        return self.pos
+    def tell(self):
+        return self.pos
+    def close(self):
+        self.data.release()
+
+class MuDigest:
+    # write-only file that hashes whatever is written to it
+    def __init__(self):
+        self.hash = hashlib.sha1()
+    def write(self, data):
+        self.hash.update(data)
+        return len(data)
+
+def fingerprint(record):
+    # sha1 of the record as written (materials by index only)
+    mu = Mu()
+    mu.copy_raw = False
+    mu.file = MuDigest()
+    record.write(mu)
+    return mu.file.hash.hexdigest()
+
+class MuProfile:
+    # bytes, count and time per entry type read and written
+    def __init__(self):
+        self.stats = {"read": {}, "write": {}}
+    def add(self, direction, key, size, count, seconds):
+        stats = self.stats[direction]
+        if key not in stats:
+            stats[key] = [0, 0, 0.0]
+        entry = stats[key]
+        entry[0] += size
+        entry[1] += count
+        entry[2] += seconds
+    def report(self):
+        # {"read": {name: {"bytes":, "count":, "time":}}, "write": {...}}
+        names = {v: k for k, v in MuEnum.ENTRY_TYPES.items()}
+        report = {}
+        for direction, stats in self.stats.items():
+            report[direction] = {}
+            for key, (size, count, seconds) in stats.items():
+                report[direction][names.get(key, key)] = {
+                    "bytes": size, "count": count, "time": seconds,
+                }
+        return report
+    def format(self):
+        lines = []
+        for direction, stats in self.report().items():
+            if not stats:
+                continue
+            lines.append("%-28s %10s %9s %10s"
+                         % (direction, "bytes", "count", "ms"))
+            entries = sorted(stats.items(), key=lambda e: -e[1]["time"])
+            for name, entry in entries:
+                lines.append("    %-24s %10d %9d %10.3f"
+                             % (name, entry["bytes"], entry["count"],
+                                entry["time"] * 1000))
+        return "\n".join(lines)
+
+class MuCounter:
+    # write-through file wrapper counting the bytes written
+    def __init__(self, file):
+        self.file = file
+        self.offset = 0
+        self.head = b""     # first bytes written since the last mark
+    def write(self, data):
+        if len(self.head) < 4:
+            self.head += bytes(data[:4 - len(self.head)])
+        self.offset += len(data)
+        return self.file.write(data)
+    def tell(self):
+        return self.offset
+    def mark(self):
+        self.head = b""
+    def close(self):
+        self.file.close()
+
+class MuIndex:
+    # where each object path, component, material and texture starts
+    FORMAT = 2
+    cache = {}      # absolute path -> MuIndex
+    def __init__(self):
+        self.size = 0
+        self.mtime = 0
+        self.version = 0
+        self.name = ""
+        self.objects = {}       # path -> offset of transform
+        self.components = {}    # path -> [[entry type, offset, length]...]
+        self.materials = []     # offset of each material
+        self.textures = []      # offset of each texture
+        self.path = []
+        self.hidden = []        # per level of path: skipped duplicate?
+    def enter(self, name, offset):
+        self.path.append(name)
+        path = "/".join(self.path)
+        # first of any identically named siblings wins: later ones, and
+        # everything under them, are left out of the index
+        hidden = path in self.objects or bool(self.hidden and self.hidden[-1])
+        self.hidden.append(hidden)
+        if not hidden:
+            self.objects[path] = offset
+            self.components[path] = []
+    def leave(self):
+        self.path.pop()
+        self.hidden.pop()
+    def add_component(self, entry_type, offset, length):
+        if self.hidden[-1]:
+            return
+        path = "/".join(self.path)
+        self.components[path].append([entry_type, offset, length])
+    def matches(self, stat):
+        return self.size == stat.st_size and self.mtime == stat.st_mtime_ns
+    def todict(self):
+        return {
+            "format": self.FORMAT,
+            "size": self.size,
+            "mtime": self.mtime,
+            "version": self.version,
+            "name": self.name,
+            "objects": self.objects,
+            "components": self.components,
+            "materials": self.materials,
+            "textures": self.textures,
+        }
+    def fromdict(self, data):
+        if data.get("format") != self.FORMAT:
+            return None
+        self.size = data["size"]
+        self.mtime = data["mtime"]
+        self.version = data["version"]
+        self.name = data["name"]
+        self.objects = data["objects"]
+        self.components = data["components"]
+        self.materials = data["materials"]
+        self.textures = data["textures"]
+        return self
+    @classmethod
+    def build(cls, filepath):
+        stat = os.stat(filepath)
+        index = cls()
+        mu = Mu()
+        mu.indexer = index
+        if not mu.scan(filepath):
+            return None
+        index.size = stat.st_size
+        index.mtime = stat.st_mtime_ns
+        index.version = mu.version
+        index.name = mu.name
+        return index
+    @classmethod
+    def load(cls, filepath, sidecar=False):
+        stat = os.stat(filepath)
+        key = os.path.abspath(filepath)
+        index = cls.cache.get(key)
+        if index and index.matches(stat):
+            return index
+        index = None
+        idxpath = filepath + ".muidx"
+        if sidecar and os.path.isfile(idxpath):
+            try:
+                with open(idxpath, "rt") as f:
+                    index = cls().fromdict(json.load(f))
+            except (OSError, ValueError, KeyError):
+                index = None
+            if index and not index.matches(stat):
+                index = None
+        if not index:
+            index = cls.build(filepath)
+            if not index:
+                return None
+            if sidecar:
+                try:
+                    with open(idxpath, "wt") as f:
+                        json.dump(index.todict(), f)
+                except OSError:
+                    pass    # eg, read-only GameData: memory cache only
+        cls.cache[key] = index
+        return index
 
 def bound(mi, x, ma):
     if x < mi:
@@ -1008,7 +2113,15 @@ def bound(mi, x, ma):
         return ma
     return x
 
+# byte to float for vertex colors (double precision so colors survive a
+# read/write cycle exactly)
+color_scale = tuple(c / 255.0 for c in range(256))
+
+def quantize_color(x):
+    return int(bound(0, x, 1) * 255)
+
 class Mu:
+    write_buffer_size = 4 * 1024 * 1024
 
     def read_byte(self, count=1, force_list=False):
         size = 1 * count
@@ -1087,69 +2200,242 @@ class Mu:
         t = t[0], t[2], t[1], -t[3]
         return t
 
+    def read_array(self, typecode, count):
+        data = array(typecode)
+        size = data.itemsize * count
+        buf = self.file.read(size)
+        if len(buf) < size:
+            raise EOFError
+        data.frombytes(buf)
+        if sys.byteorder == "big":
+            data.byteswap()
+        return data
+
+    def read_attribute(self, count, width, order, negate=(), arrays=None):
+        # one bulk read for the whole block, then convert from Unity's LHS
+        # to Blender's RHS by permuting the columns
+        data = self.read_array("f", count * width)
+        data = swizzle(data, width, order, negate)
+        attr = MuArray(width, data)
+        if arrays is None:
+            arrays = self.arrays
+        if arrays:
+            return attr
+        return attr.tolist()
+
+    def read_triangles(self, num_verts):
+        # one bulk read for the whole index block, checked and converted
+        # to Blender's winding. Out of range indices are only reported, so
+        # such models still load (writing them back is refused).
+        num_indices = self.read_int()
+        if num_indices % 3:
+            raise ValueError("MuMesh: %d triangle indices is not a multiple"
+                             " of 3" % num_indices)
+        data = self.read_array("i", num_indices)
+        if not indices_in_range(data, num_verts):
+            print("MuMesh: triangle index out of range (%d vertices)"
+                  % num_verts)
+        #reverse the triangle winding for Blender (because of the LHS/RHS
+        # swap)
+        data = swizzle(data, 3, (2, 1, 0))
+        #avoid putting 0 at the end of the list (Blender doesn't like that):
+        #rotate those triangles instead
+        for tri in compress(range(num_indices // 3), map(not_, data[2::3])):
+            i = tri * 3
+            data[i], data[i + 1], data[i + 2] = 0, data[i], data[i + 1]
+        tris = MuArray(3, data)
+        if self.arrays:
+            return tris
+        return tris.tolist()
+
+    def read_colors(self, count):
+        # RGBA8 per vertex, normalized through a lookup table
+        data = self.read_array("B", count * 4)
+        colors = MuArray(4, array("d", map(color_scale.__getitem__, data)))
+        if self.arrays:
+            return colors
+        return colors.tolist()
+
     def read_bytes(self, size):
         data = self.file.read(size)
         if len(data) < size:
             raise EOFError
         return data
 
+    def skip(self, size):
+        self.file.seek(size, 1)
+
+    def read_deferred(self, cls, skip):
+        if self.scanning:
+            return skip(self)
+        if not self.lazy:
+            return cls().read(self)
+        record = cls.__new__(cls)
+        offset = self.file.tell()
+        skip(self)
+        record._lazy = self.reader, offset, self.file.tell() - offset
+        return record
+
     def read_string(self):
         size = self.read_7int()
         data = self.file.read(size)
         if len(data) < size:
             raise EOFError
+        if self.profile is not None:
+            self.profile.add("read", "strings", size, 1, 0.0)
         if type(data) == type(""):
             return data
-        s = ""
-        for c in data:
-            s = s + chr(c)
+        if type(data) != bytes:
+            data = bytes(data)  # memoryview from MuBuffer
+        # names, paths and property names repeat a lot, so share one string
+        # object per distinct value within the file
+        s = self.strings.get(data)
+        if s is None:
+            # bytes map directly to code points (as chr() per byte did)
+            s = self.strings[data] = data.decode("latin-1")
         return s
 
+    def profile_start(self):
+        if self.profile is None:
+            return None
+        return self.file.tell(), perf_counter()
+    def profile_stop(self, direction, key, start, count=1):
+        if start is None:
+            return
+        offset, time = start
+        self.profile.add(direction, key, self.file.tell() - offset, count,
+                         perf_counter() - time)
+    def write_record(self, write, entry_type=None):
+        # write(self), profiled. Without entry_type, the entry type is the
+        # first int written (components start with theirs).
+        if self.profile is None:
+            write(self)
+            return
+        start = self.profile_start()
+        self.file.mark()
+        write(self)
+        if entry_type is None:
+            entry_type = unpack("<i", self.file.head)[0]
+        self.profile_stop("write", entry_type, start)
+    def write_raw(self, record, entry_type=None):
+        # a still deferred record (see MuLazy) was never touched, so copy its
+        # bytes (after entry_type, if the record's write starts with one that
+        # is not part of the deferred range) straight from the source.
+        # Without copy_raw, a decoded copy is written instead (the writer
+        # normalizes triangle order, so the raw bytes may differ from what
+        # the decoded record would give), leaving the record itself deferred.
+        lazy = record.__dict__.get("_lazy")
+        if not lazy:
+            return False
+        reader, offset, length = lazy
+        reader.file.seek(offset)
+        if not self.copy_raw:
+            type(record)().read(reader).write(self)
+            return True
+        if entry_type is not None:
+            self.write_int(entry_type)
+        self.file.write(reader.file.read(length))
+        return True
+
+    def write_struct(self, layout, *data):
+        self.file.write(layout.pack(*data))
+
     def write_byte(self, data):
         if not hasattr(data, "__len__"):
-            data = (data,)
-        self.file.write(pack(("<%dB" % len(data)), *data))
+            self.file.write(MuLayout.uint8.pack(data))
+        else:
+            self.file.write(pack(("<%dB" % len(data)), *data))
 
     def write_int(self, data):
         if not hasattr(data, "__len__"):
-            data = (data,)
-        self.file.write(pack(("<%di" % len(data)), *data))
+            self.file.write(MuLayout.int32.pack(data))
+        else:
+            self.file.write(pack(("<%di" % len(data)), *data))
 
     def write_7int(self, data):
-        def writeval(val):
+        if not hasattr(data, "__len__"):
+            data = (data,)
+        buf = bytearray()
+        for val in data:
             if val < 0:
                 val += 1 << 32
             val &= (1 << 32) - 1
             while val > 127:
-                self.write_byte((val & 127) + 128)
+                buf.append((val & 127) + 128)
                 val >>= 7
-            self.write_byte(val)
-        if not hasattr(data, "__len__"):
-            data = (data,)
-        for d in data:
-            writeval(d)
+            buf.append(val)
+        self.file.write(buf)
 
     def write_uint(self, data):
         if not hasattr(data, "__len__"):
-            data = (data,)
-        self.file.write(pack(("<%dI" % len(data)), *data))
+            self.file.write(MuLayout.uint32.pack(data))
+        else:
+            self.file.write(pack(("<%dI" % len(data)), *data))
 
     def write_float(self, data):
         if not hasattr(data, "__len__"):
-            data = (data,)
-        self.file.write(pack(("<%df" % len(data)), *data))
+            self.file.write(MuLayout.float32.pack(data))
+        else:
+            self.file.write(pack(("<%df" % len(data)), *data))
+
+    def write_array(self, data):
+        if sys.byteorder == "big":
+            data = array(data.typecode, data)
+            data.byteswap()
+        self.file.write(data.tobytes())
+
+    def write_attribute(self, data, width, order, negate=()):
+        # accepts either a MuArray or a sequence of width-element vectors
+        # and writes the whole block at once, converting from Blender's RHS
+        # to Unity's LHS by permuting the columns
+        count = len(data)
+        if isinstance(data, MuStream):
+            # a chunk at a time
+            size = 0
+            for chunk in data.flat():
+                if len(chunk) % width:
+                    raise ValueError("expected %d values per vertex" % width)
+                self.write_array(swizzle(chunk, width, order, negate))
+                size += len(chunk)
+            if size != count * width:
+                raise ValueError("expected %d vertices" % count)
+            return
+        if isinstance(data, MuArray):
+            data = data.data
+            if data.typecode != "f":
+                data = array("f", data)
+        else:
+            data = array("f", chain.from_iterable(data))
+        if len(data) != count * width:
+            raise ValueError("expected %d values per vertex" % width)
+        self.write_array(swizzle(data, width, order, negate))
+
+    def write_triangles(self, tris, num_verts):
+        # accepts either a MuArray or a sequence of triangles and writes
+        # the whole index block at once
+        if isinstance(tris, MuArray):
+            data = tris.data
+            if data.typecode != "i":
+                data = array("i", data)
+        else:
+            data = array("i", chain.from_iterable(tris))
+        if len(data) % 3:
+            raise ValueError("expected 3 indices per triangle")
+        check_indices(data, num_verts)
+        self.write_int(len(data))
+        #reverse the triangle winding for Blender (because of the LHS/RHS
+        # swap)
+        self.write_array(swizzle(data, 3, (0, 2, 1)))
 
     def write_vector(self, v):
         #convert from Blender's RHS to Unity's LHS
-        v = v[0], v[2], v[1]
-        self.write_float(v)
+        self.file.write(MuLayout.vector.pack(v[0], v[2], v[1]))
 
     def write_quaternion(self, q):
         # Unity is xyzw, blender is wxyz. However, Unity is left-handed and
         # blender is right handed. To convert between LH and RH (either
         # direction), just swap y and z and reverse the rotation direction.
-        q = -q[1], -q[3], -q[2], q[0]
-        self.write_float(q)
+        self.file.write(MuLayout.quaternion.pack(-q[1], -q[3], -q[2], q[0]))
 
     def write_tangent(self, t):
         t = t[0], t[2], t[1], -t[3]
@@ -1159,6 +2445,29 @@ class Mu:
         cb = tuple(map(lambda x: int(bound(0, x, 1) * 255), c))
         self.write_byte(cb)
 
+    def write_colors(self, colors):
+        # clamp and quantize the whole block, then write it at once
+        count = len(colors)
+        if isinstance(colors, MuStream):
+            # a chunk at a time
+            size = 0
+            for chunk in colors.flat("d"):
+                if len(chunk) % 4:
+                    raise ValueError("expected 4 color components per vertex")
+                self.file.write(bytes(map(quantize_color, chunk)))
+                size += len(chunk)
+            if size != count * 4:
+                raise ValueError("expected %d vertices" % count)
+            return
+        if isinstance(colors, MuArray):
+            data = colors.data
+        else:
+            data = chain.from_iterable(colors)
+        data = bytes(map(quantize_color, data))
+        if len(data) != count * 4:
+            raise ValueError("expected 4 color components per vertex")
+        self.file.write(data)
+
     def write_bytes(self, data, size=-1):
         if size == -1:
             size = len(data)
@@ -1169,44 +2478,376 @@ class Mu:
     def write_string(self, data, size=-1):
         data = data.encode()
         size = len(data)
+        if self.profile is not None:
+            self.profile.add("write", "strings", size, 1, 0.0)
         self.write_7int(size)
         self.write_bytes(data, size)
 
     def __init__(self, name = "mu"):
         self.name = name
-        pass
-    def read(self, filepath):
+        self.arrays = False
+        self.lazy = False
+        self.scanning = False
+        self.strings = {}
+        self.indexer = None
+        self.index = None
+        self.profile = None
+        self.tree = None
+        self.copy_raw = True
+    def hierarchy(self, rebuild=False):
+        # the MuHierarchy of self.obj, built on first use (rebuild after
+        # changing the object tree)
+        if rebuild or self.tree is None or self.tree.root is not self.obj:
+            self.tree = MuHierarchy(self.obj)
+        return self.tree
+    def merge_materials(self):
+        # merge duplicate textures and materials; returns the counts
+        def value(v):
+            return v if type(v) is float else tuple(v)
+        def properties(props):
+            return tuple((k, value(props[k])) for k in sorted(props))
+        textures, texmap, seen = [], [], {}
+        for tex in self.textures:
+            key = tex.name, tex.type
+            if key not in seen:
+                seen[key] = len(textures)
+                textures.append(tex)
+            texmap.append(seen[key])
+        materials, matmap, seen = [], [], {}
+        for mat in self.materials:
+            texprops = mat.textureProperties
+            for mattex in texprops.values():
+                if 0 <= mattex.index < len(texmap):
+                    mattex.index = texmap[mattex.index]
+            key = (mat.shaderName,
+                   properties(mat.colorProperties),
+                   properties(mat.vectorProperties),
+                   properties(mat.floatProperties2),
+                   properties(mat.floatProperties3),
+                   tuple((k, texprops[k].index, tuple(texprops[k].scale),
+                          tuple(texprops[k].offset))
+                         for k in sorted(texprops)))
+            if key not in seen:
+                seen[key] = len(materials)
+                materials.append(mat)
+            matmap.append(seen[key])
+        for obj in self.hierarchy().objects:
+            for name in ["renderer", "skinned_mesh_renderer"]:
+                renderer = getattr(obj, name, None)
+                if renderer is None:
+                    continue
+                renderer.materials = [matmap[m] if 0 <= m < len(matmap)
+                                      else m for m in renderer.materials]
+        for index, record in chain(enumerate(materials), enumerate(textures)):
+            if hasattr(record, "index"):
+                record.index = index
+        removed = (len(self.materials) - len(materials),
+                   len(self.textures) - len(textures))
+        self.materials = materials
+        self.textures = textures
+        return removed
+    def simplify_animations(self, tolerance=KEY_TOLERANCE):
+        # simplify all curves and drop constant transform sets
+        tree = self.hierarchy()
+        keys_removed = 0
+        curves_dropped = 0
+        for index, obj in enumerate(tree.objects):
+            animation = getattr(obj, "animation", None)
+            if animation is None:
+                continue
+            for clip in animation.clips:
+                ends = [curve.keys[-1].time for curve in clip.curves
+                        if len(curve.keys)]
+                sets = {}
+                for curve in clip.curves:
+                    keys_removed += curve.simplify(tolerance)
+                    if (curve.type == 0
+                            and curve.property in transform_properties):
+                        prefix = curve.property.rsplit(".", 1)[0]
+                        sets.setdefault((curve.path, prefix), []).append(curve)
+                dropped = [curves for curves in sets.values()
+                           if all(holds_rest_value(tree, index, curve,
+                                                   tolerance)
+                                  for curve in curves)]
+                end = max(ends, default=0)
+                def reaches_end(curves):
+                    return any(len(c.keys) and c.keys[-1].time == end
+                               for c in curves)
+                dropped_curves = set(chain.from_iterable(dropped))
+                kept = [c for c in clip.curves if c not in dropped_curves]
+                if dropped and not reaches_end(kept):
+                    # keep the sets that decide the clip's length
+                    dropped = [curves for curves in dropped
+                               if not reaches_end(curves)]
+                    dropped_curves = set(chain.from_iterable(dropped))
+                    kept = [c for c in clip.curves if c not in dropped_curves]
+                keys_removed += sum(len(c.keys) for c in dropped_curves)
+                curves_dropped += len(dropped_curves)
+                clip.curves = kept
+        return keys_removed, curves_dropped
+    def open(self, filepath, sidecar=False):
+        # use (or build) the file's MuIndex and keep the file open for
+        # read_object, read_component, read_materials and read_textures.
+        # With sidecar, the index is also kept in a .muidx file next to the
+        # model (off by default so GameData does not fill with them)
+        self.index = MuIndex.load(filepath, sidecar)
+        if not self.index:
+            return None
+        self.version = self.index.version
+        self.name = self.index.name
+        self.arrays = False
+        self.lazy = False
+        self.scanning = False
+        self.strings = {}
+        self.materials = []
+        self.textures = []
+        self.file = self.open_source(filepath, True)[0]
+        return self
+    def close(self):
+        self.file.close()
+        del self.file
+    def read_object(self, path):
+        # the object at path, with its whole subtree
+        if path not in self.index.objects:
+            return None
+        self.file.seek(self.index.objects[path])
+        # reading the root object runs on into the material and texture
+        # tables, so collect those separately
+        materials, textures = self.materials, self.textures
+        self.materials, self.textures = [], []
+        obj = MuObject().read(self)
+        self.materials, self.textures = materials, textures
+        return obj
+    def read_component(self, path, entry_types):
+        # the first component of the object at path whose entry type is
+        # one of entry_types (a single type is also accepted)
+        if not hasattr(entry_types, "__contains__"):
+            entry_types = (entry_types,)
+        for entry_type, offset, length in self.index.components.get(path, ()):
+            if entry_type in entry_types:
+                self.file.seek(offset)
+                return read_component(self, entry_type)[1]
+        return None
+    def read_materials(self):
+        self.materials = []
+        for offset in self.index.materials:
+            self.file.seek(offset)
+            self.materials.append(MuMaterial().read(self))
+        return self.materials
+    def read_textures(self):
+        self.textures = []
+        for offset in self.index.textures:
+            self.file.seek(offset)
+            self.textures.append(MuTexture().read(self))
+        return self.textures
+    def scan(self, filepath):
+        # read only the hierarchy, components, materials and textures:
+        # meshes become MuMeshInfo and animations MuAnimationInfo
+        return self.read(filepath, scan=True)
+    def open_source(self, source, random_access=False):
+        # returns the file to read from and whether it needs closing.
+        # Compressed sources are decompressed as they are read, unless
+        # random access is needed (lazy mode, Mu.open), in which case the
+        # whole model is decompressed into memory.
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            compression = compression_of(bytes(source[:6]))
+            if not compression:
+                return MuBuffer(source), False
+            file = open_compressed(compression, io.BytesIO(source), "rb")
+        elif hasattr(source, "read"):
+            compression = None
+            if hasattr(source, "seekable") and source.seekable():
+                head = source.read(6)
+                source.seek(-len(head), 1)
+                compression = compression_of(head)
+            if not compression:
+                return source, False
+            file = open_compressed(compression, source, "rb")
+        else:
+            file = open(source, "rb")
+            compression = compression_of(file.peek(6)[:6])
+            if compression:
+                file.close()
+                file = open_compressed(compression, source, "rb")
+            elif random_access:
+                with file:
+                    return mmap.mmap(file.fileno(), 0,
+                                     access=mmap.ACCESS_READ), False
+            else:
+                return file, True
+        if random_access:
+            with file:
+                return MuBuffer(file.read()), False
+        return file, True
+    def read(self, source, arrays=False, lazy=False, scan=False,
+             profile=False):
+        # source: a file path, a binary file-like object (eg, a zip archive
+        # member) or a bytes-like object (read in place, without copying)
+        # arrays: keep mesh vertex attributes as MuArray instead of lists
+        # of tuples
+        # lazy: map the file and decode meshes and animations only when
+        # first accessed. Those never accessed are copied verbatim by write,
+        # so reading lazily makes for fast, bit-exact fix-up rewrites.
+        # scan: see Mu.scan
+        # profile: collect a MuProfile in self.profile (later writes of
+        # this Mu add to it)
+        self.arrays = arrays
+        self.lazy = lazy and not scan
+        self.scanning = scan
+        self.strings = {}
         self.materials = []
         self.textures = []
-        self.file = open(filepath, "rb")
+        if profile:
+            self.profile = MuProfile()
+        self.source = None
+        if self.lazy and not hasattr(source, "read"):
+            if not isinstance(source, (bytes, bytearray, memoryview)):
+                self.source = os.path.abspath(source)
+        self.file, close = self.open_source(source, self.lazy)
+        try:
+            return self.read_model()
+        finally:
+            if close:
+                self.file.close()
+            del self.file
+    def read_model(self):
         self.magic, self.version = self.read_int(2)
         if (self.magic != MuEnum.MODEL_BINARY or self.version < 0
             or self.version > MuEnum.FILE_VERSION):
             return None
+        if self.lazy:
+            # deferred records decode through their own reader so they are
+            # not affected by later use of this Mu (eg, write)
+            self.reader = Mu(self.name)
+            self.reader.version = self.version
+            self.reader.arrays = self.arrays
+            self.reader.strings = self.strings
+            self.reader.profile = self.profile
+            self.reader.file = self.file
         self.name = self.read_string()
         #print("version: %d '%s'" % (self.version, self.name))
         self.obj = MuObject().read(self)
         #self.read_materials()
         #self.read_textures()
-        del self.file
         return self
-    def write(self, filepath):
-        self.file = open(filepath, "wb")
+    def write(self, target, compression=None):
+        # target: a file path or a binary file-like object
+        # compression: "gzip", "xz" or "bz2" to write a compressed model.
+        # Defaults to the extension of a target path (.gz, .xz, .bz2).
+        if hasattr(target, "write"):
+            if compression:
+                self.file = open_compressed(compression, target, "wb")
+                try:
+                    self.write_model()
+                finally:
+                    self.file.close()
+            else:
+                self.file = target
+                self.write_model()
+            del self.file
+            return
+        if compression is None:
+            ext = os.path.splitext(target)[1].lower()
+            compression = compression_extensions.get(ext)
+        path = target
+        if self.overwrites_source(target):
+            # deferred records still read from the source, so build the new
+            # file alongside and then replace the old one
+            path = target + ".tmp"
+        if compression:
+            self.file = open_compressed(compression, path, "wb")
+        else:
+            # the many small writes are collected by a large buffer so
+            # typical models reach the disk in a single flush
+            self.file = open(path, "wb", self.write_buffer_size)
+        try:
+            self.write_model()
+        finally:
+            self.file.close()
+            del self.file
+        if path != target:
+            self.detach_source()
+            os.replace(path, target)
+    def detach_source(self):
+        # deferred records read from a copy in memory from now on, so the
+        # mapping of the source file is closed (a mapped file can't be
+        # replaced on Windows)
+        reader = getattr(self, "reader", None)
+        if reader is not None and isinstance(reader.file, mmap.mmap):
+            data = reader.file[:]
+            reader.file.close()
+            reader.file = MuBuffer(data)
+        self.source = None
+    def overwrites_source(self, target):
+        source = getattr(self, "source", None)
+        return (source is not None and os.path.exists(target)
+                and os.path.samefile(source, target))
+    def write_model(self):
+        if self.profile is not None:
+            self.file = MuCounter(self.file)
         self.write_int(MuEnum.MODEL_BINARY)
         self.write_int(MuEnum.FILE_VERSION)
         self.write_string(self.name)
         self.obj.write(self)
         if len(self.materials):
+            start = self.profile_start()
             self.write_int(MuEnum.ET_MATERIALS)
             self.write_int(len(self.materials))
             for mat in self.materials:
                 mat.write(self)
+            self.profile_stop("write", MuEnum.ET_MATERIALS, start,
+                              len(self.materials))
         if len(self.textures):
+            start = self.profile_start()
             self.write_int(MuEnum.ET_TEXTURES)
             self.write_int(len(self.textures))
             for tex in self.textures:
                 tex.write(self)
-        del self.file
+            self.profile_stop("write", MuEnum.ET_TEXTURES, start,
+                              len(self.textures))
+
+def read_selected(path, select, options):
+    # runs in the worker processes of read_many. A file that fails to read
+    # (missing, truncated, corrupt) gives None like non-.mu files, rather
+    # than ending the whole scan
+    mu = Mu()
+    try:
+        if not mu.read(path, **options):
+            return None
+        if select:
+            return select(mu)
+    except Exception as e:
+        print("%s: %s" % (path, str(e) or type(e).__name__))
+        return None
+    return mu
+
+def read_many(paths, workers=None, select=None, ordered=True, **options):
+    # (path, select(mu) or the Mu, None if not readable) per path
+    if options.get("lazy") and not select:
+        raise ValueError("lazy reads need a selector")
+    options.setdefault("arrays", True)
+    paths = list(paths)
+    if workers == 0:
+        for path in paths:
+            yield path, read_selected(path, select, options)
+        return
+    if not workers:
+        workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as pool:
+        if ordered:
+            # several files per task keeps the per-task overhead down
+            chunksize = max(1, len(paths) // (workers * 4))
+            results = pool.map(read_selected, paths, repeat(select),
+                               repeat(options), chunksize=chunksize)
+            for path, result in zip(paths, results):
+                yield path, result
+        else:
+            futures = {}
+            for path in paths:
+                future = pool.submit(read_selected, path, select, options)
+                futures[future] = path
+            for future in as_completed(futures):
+                yield futures[future], future.result()
 
 if __name__ == "__main__":
     mu = Mu()
@@ -16,7 +16,7 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 #
 # ##### END GPL LICENSE BLOCK #####
-from mu import Mu
+from mu import read_many
 from cfgnode import ConfigNode
 import sys
 
@@ -45,7 +45,13 @@ def add_thing(thing, mu, node, exclude, add_funcs):
     for a in dir(thing):
         if a[0] == "_" or a in ["read", "write", "components"] or a in exclude:
             continue
+        if not hasattr(thing, a):
+            # unset slot
+            continue
         attr = getattr(thing, a)
+        if callable(attr):
+            # methods (eg, fingerprint)
+            continue
         n = attr.__class__.__name__
         if type(attr) is dict:
             if attr:
@@ -150,7 +156,7 @@ mesh_add_funcs = {
 
 def add_mesh(name, mu, mesh, node):
     mesh_node = node.AddNewNode("Mesh")
-    add_thing(mesh, mu, mesh_node, [], mesh_add_funcs)
+    add_thing(mesh, mu, mesh_node, ["vertex_sizes"], mesh_add_funcs)
 
 def add_bones(name, mu, bones, node):
     for b in bones:
@@ -302,16 +308,17 @@ def add_object(mu, obj, node):
     for child in obj.children:
         add_object(mu, child, obj_node)
 
-def makecfg(fname):
-    mu = Mu()
-    if not mu.read(fname):
-        print("could not read: " + fname)
-        raise
+def makecfg(mu):
+    # runs in a read_many worker: only the cfg text comes back
     cfg = ConfigNode()
     add_textures(mu, cfg)
     add_materials(mu, cfg)
     add_object(mu, mu.obj, cfg)
-    print(cfg.ToString())
-
-for f in sys.argv[1:]:
-    makecfg(f)
+    return cfg.ToString()
+
+if __name__ == "__main__":
+    for f, text in read_many(sys.argv[1:], select=makecfg, arrays=False):
+        if text is None:
+            print("could not read: " + f)
+            sys.exit(1)
+        print(text)
@@ -0,0 +1,62 @@
+# vim:ts=4:et
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Command line handling shared by the tools that modify .mu files
+# (mergematerials.py, vertexcache.py, compactmesh.py, simplifyanim.py).
+# Each file is read, changed, then written back in place, or to -o output
+# when given a single file. -n only reports what would change.
+
+from mu import Mu
+import getopt
+import io
+import os
+import sys
+
+def parse_args(usage, shortopts=""):
+    # -n and -o plus the tool's own options (shortopts, getopt style)
+    opts, args = getopt.getopt(sys.argv[1:], "no:" + shortopts)
+    if not args or ("-o" in dict(opts) and len(args) > 1):
+        print(usage)
+        sys.exit(1)
+    return opts, args
+
+def rewrite_models(opts, args, fix, **read_options):
+    # fix(path, mu) changes the model read with read_options (see Mu.read)
+    # and returns whether there was anything to change: unchanged files are
+    # not rewritten (but are still written to -o output)
+    opts = dict(opts)
+    dry_run = "-n" in opts
+    output = opts.get("-o")
+    for path in args:
+        mu = Mu()
+        if not mu.read(path, **read_options):
+            print("could not read: " + path)
+            sys.exit(1)
+        if not fix(path, mu) and not output:
+            continue
+        size = os.path.getsize(path)
+        if dry_run:
+            f = io.BytesIO()
+            mu.write(f)
+            new_size = len(f.getvalue())
+        else:
+            mu.write(output or path)
+            new_size = os.path.getsize(output or path)
+        print("    %d -> %d bytes (%.1f%%)"
+              % (size, new_size, 100.0 * new_size / size))
@@ -0,0 +1,60 @@
+# vim:ts=4:et
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Remove redundant animation keys from .mu files: keys the curve's Hermite
+# interpolation reproduces within the tolerance (-t, in the curve's units),
+# and position, rotation and scale curve sets that just hold the object's
+# rest value.
+#   python3 simplifyanim.py [-n] [-t tolerance] [-o output.mu] model.mu [...]
+
+from mu import KEY_TOLERANCE
+from rewrite import parse_args, rewrite_models
+
+def count_keys(mu):
+    keys = 0
+    curves = 0
+    for obj in mu.hierarchy().objects:
+        if hasattr(obj, "animation"):
+            for clip in obj.animation.clips:
+                curves += len(clip.curves)
+                keys += sum(len(curve.keys) for curve in clip.curves)
+    return keys, curves
+
+def main():
+    tolerance = KEY_TOLERANCE
+    opts, args = parse_args("simplifyanim.py [-n] [-t tolerance] "
+                            "[-o output.mu] <mu-file> [mu-file ...]", "t:")
+    for o, a in opts:
+        if o == "-t":
+            tolerance = float(a)
+
+    def simplify(path, mu):
+        num_keys, num_curves = count_keys(mu)
+        if not num_keys:
+            print("%s: no animation keys" % path)
+            return False
+        keys, curves = mu.simplify_animations(tolerance)
+        print("%s: keys %d -> %d (%d removed), curves %d -> %d"
+              % (path, num_keys, num_keys - keys, keys, num_curves,
+                 num_curves - curves))
+        return keys or curves
+    rewrite_models(opts, args, simplify, lazy=True)
+
+if __name__ == "__main__":
+    main()
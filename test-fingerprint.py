@@ -0,0 +1,74 @@
+# Check that lazy and eager reads of a model give the same fingerprints,
+# including meshes whose triangles the writer rotates.
+#   python3 test-fingerprint.py
+
+import os
+import tempfile
+
+from mu import Mu, MuMesh, MuAnimation, MuClip, MuCurve, MuKey
+from testmodel import make_obj, make_model
+
+def make_mesh():
+    mesh = MuMesh()
+    mesh.verts = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0),
+                  (0.0, 0.0, 1.0)]
+    # triangles with 0 in each place: reading rotates some of them
+    mesh.submeshes = [[(1, 2, 0), (0, 3, 1), (2, 0, 3), (1, 2, 3)]]
+    return mesh
+
+def make_animation():
+    anim = MuAnimation()
+    anim.clip = "spin"
+    anim.autoPlay = 0
+    clip = MuClip()
+    clip.name = "spin"
+    clip.lbCenter = (0.0, 0.0, 0.0)
+    clip.lbSize = (1.0, 1.0, 1.0)
+    clip.wrapMode = 0
+    curve = MuCurve()
+    curve.path = ""
+    curve.property = "m_LocalPosition.x"
+    curve.type = 0
+    curve.wrapMode = (0, 0)
+    curve.keys = []
+    for i in range(3):
+        key = MuKey()
+        key.time = float(i)
+        key.value = i * 0.5
+        key.tangent = (0.5, 0.5)
+        key.tangentMode = 0
+        curve.keys.append(key)
+    clip.curves.append(curve)
+    anim.clips.append(clip)
+    return anim
+
+def fingerprints(model):
+    obj = model.obj
+    mesh = obj.children[0].shared_mesh
+    return [obj.fingerprint(), obj.children[0].fingerprint(),
+            mesh.fingerprint(), obj.animation.clips[0].fingerprint()]
+
+def main():
+    root = make_obj("model")
+    body = make_obj("body")
+    body.shared_mesh = make_mesh()
+    root.children.append(body)
+    root.animation = make_animation()
+    mu = make_model(root)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fp.mu")
+        mu.write(path)
+        eager = Mu().read(path)
+        lazy = Mu().read(path, lazy=True)
+        mesh = lazy.obj.children[0].shared_mesh
+        assert fingerprints(lazy) == fingerprints(eager), \
+            "lazy and eager fingerprints differ"
+        assert "_lazy" in mesh.__dict__, "hashing decoded the lazy mesh"
+        with open(path, "rb") as f:
+            data = f.read()
+        assert fingerprints(Mu().read(data, lazy=True)) \
+            == fingerprints(eager), "fingerprints differ for bytes sources"
+    print("ok")
+
+if __name__ == "__main__":
+    main()
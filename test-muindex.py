@@ -0,0 +1,48 @@
+# Check that MuIndex files components under the right object when siblings
+# share a name (only the first of them is indexed).
+#   python3 test-muindex.py
+
+import os
+import sys
+import tempfile
+
+from mu import Mu, MuColliderSphere, MuEnum, collider_types
+from testmodel import make_obj, make_model
+
+def make_sphere(radius):
+    collider = MuColliderSphere(True)
+    collider.isTrigger = 0
+    collider.radius = radius
+    collider.center = (0.0, 0.0, 0.0)
+    return collider
+
+def main():
+    root = make_obj("model")
+    first = make_obj("body")
+    second = make_obj("body")
+    second.collider = make_sphere(2.0)
+    child = make_obj("inner")
+    child.collider = make_sphere(3.0)
+    second.children.append(child)
+    root.children = [first, second]
+    mu = make_model(root)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dup.mu")
+        mu.write(path)
+        model = Mu()
+        if not model.open(path):
+            print("could not open: " + path)
+            sys.exit(1)
+        obj = model.read_object("model/body")
+        assert not hasattr(obj, "collider"), "read the second sibling"
+        assert model.read_component("model/body", collider_types) is None, \
+            "second sibling's collider filed under the first"
+        assert model.read_object("model/body/inner") is None, \
+            "second sibling's subtree filed under the first"
+        assert model.read_component("model", MuEnum.ET_MESH_FILTER) is None
+        model.close()
+        assert not os.path.exists(path + ".muidx"), "sidecar written"
+    print("ok")
+
+if __name__ == "__main__":
+    main()
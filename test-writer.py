@@ -0,0 +1,131 @@
+# Check that Mu.write encodes meshes byte for byte the same as the original
+# per-vertex writer (reproduced here with struct), whether the attributes
+# are lists of tuples, MuArrays (arrays=True) or MuStreams.
+#   python3 test-writer.py
+
+import io
+import random
+from struct import pack
+
+from mu import Mu, MuMesh, MuBoneWeight, MuStream, MuEnum, chunked
+
+def bound(mi, x, ma):
+    return min(max(x, mi), ma)
+
+def reference_mesh(mesh):
+    # MuMesh.write as it was before the block writers
+    out = []
+    def ints(*data):
+        out.append(pack("<%di" % len(data), *data))
+    def floats(*data):
+        out.append(pack("<%df" % len(data), *data))
+    verts = list(mesh.verts)
+    num_verts = len(verts)
+    ints(MuEnum.ET_MESH_START, num_verts, len(mesh.submeshes))
+    ints(MuEnum.ET_MESH_VERTS)
+    for v in verts:
+        floats(v[0], v[2], v[1])
+    for entry_type, attr in ((MuEnum.ET_MESH_UV, mesh.uvs),
+                             (MuEnum.ET_MESH_UV2, mesh.uv2s)):
+        if len(attr) == num_verts:
+            ints(entry_type)
+            for uv in attr:
+                floats(*uv)
+    if len(mesh.normals) == num_verts:
+        ints(MuEnum.ET_MESH_NORMALS)
+        for n in mesh.normals:
+            floats(n[0], n[2], n[1])
+    if len(mesh.tangents) == num_verts:
+        ints(MuEnum.ET_MESH_TANGENTS)
+        for t in mesh.tangents:
+            floats(t[0], t[2], t[1], -t[3])
+    if len(mesh.boneWeights) == num_verts:
+        ints(MuEnum.ET_MESH_BONE_WEIGHTS)
+        for bw in mesh.boneWeights:
+            for i in range(4):
+                ints(bw.indices[i])
+                floats(bw.weights[i])
+    if len(mesh.bindPoses):
+        ints(MuEnum.ET_MESH_BIND_POSES, len(mesh.bindPoses))
+        for bp in mesh.bindPoses:
+            floats(*bp)
+    if len(mesh.colors) == num_verts:
+        ints(MuEnum.ET_MESH_VERTEX_COLORS)
+        for c in mesh.colors:
+            out.append(pack("<4B", *(int(bound(0, x, 1) * 255) for x in c)))
+    for sm in mesh.submeshes:
+        ints(MuEnum.ET_MESH_TRIANGLES, len(sm) * 3)
+        for tri in sm:
+            ints(tri[0], tri[2], tri[1])
+    ints(MuEnum.ET_MESH_END)
+    return b"".join(out)
+
+def encode(mesh):
+    mu = Mu()
+    mu.file = io.BytesIO()
+    mesh.write(mu)
+    return mu.file.getvalue()
+
+def decode(data, arrays):
+    mu = Mu()
+    mu.arrays = arrays
+    mu.file = io.BytesIO(data)
+    return MuMesh().read(mu)
+
+def random_mesh(num_verts, skinned):
+    def r():
+        return random.uniform(-10, 10)
+    mesh = MuMesh()
+    mesh.verts = [(r(), r(), r()) for i in range(num_verts)]
+    mesh.uvs = [(r(), r()) for i in range(num_verts)]
+    mesh.uv2s = [(r(), r()) for i in range(num_verts)]
+    mesh.normals = [(r(), r(), r()) for i in range(num_verts)]
+    mesh.tangents = [(r(), r(), r(), random.choice((-1.0, 1.0)))
+                     for i in range(num_verts)]
+    mesh.colors = [tuple(random.uniform(-0.2, 1.2) for j in range(4))
+                   for i in range(num_verts)]
+    if skinned:
+        for i in range(num_verts):
+            bw = MuBoneWeight()
+            bw.indices = [random.randrange(8) for j in range(4)]
+            bw.weights = [random.random() for j in range(4)]
+            mesh.boneWeights.append(bw)
+        mesh.bindPoses = [tuple(r() for j in range(16)) for k in range(8)]
+    for s in range(2):
+        mesh.submeshes.append([tuple(random.randrange(num_verts)
+                                     for j in range(3))
+                               for t in range(num_verts)])
+    return mesh
+
+def streamed(mesh):
+    # the same mesh with its vertex attributes as MuStreams
+    for name in ["verts", "uvs", "uv2s", "normals", "tangents", "colors"]:
+        attr = list(getattr(mesh, name))
+        width = len(attr[0])
+        setattr(mesh, name, MuStream(len(attr), width,
+                                     lambda attr=attr: chunked(attr, 100)))
+    return mesh
+
+def main():
+    random.seed(5)
+    failed = False
+    for num_verts, skinned in ((1, False), (500, False), (1000, True)):
+        mesh = random_mesh(num_verts, skinned)
+        data = reference_mesh(mesh)
+        # reading back quantizes colors and may rotate triangles, so each
+        # case is checked against the reference encoding of its own data
+        cases = [("lists", mesh, mesh),
+                 ("arrays", decode(data, True), decode(data, False)),
+                 ("streams", streamed(decode(data, False)),
+                  decode(data, False))]
+        for name, case, plain in cases:
+            ok = encode(case) == reference_mesh(plain)
+            failed = failed or not ok
+            print("%5d verts%-8s %-8s %s" % (num_verts,
+                                             " skinned" if skinned else "",
+                                             name, "ok" if ok else "DIFFERENT"))
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# Builders for the small models used by the test-*.py scripts.
+
+from mu import Mu, MuObject, MuTransform, MuTagLayer
+
+def make_obj(name):
+    obj = MuObject()
+    obj.transform = MuTransform()
+    obj.transform.name = name
+    obj.transform.localPosition = (0.0, 0.0, 0.0)
+    obj.transform.localRotation = (1.0, 0.0, 0.0, 0.0)
+    obj.transform.localScale = (1.0, 1.0, 1.0)
+    obj.tag_and_layer = MuTagLayer()
+    obj.tag_and_layer.tag = "Untagged"
+    obj.tag_and_layer.layer = 0
+    return obj
+
+def make_model(root):
+    # a Mu holding root (and no materials or textures), ready to write
+    mu = Mu()
+    mu.name = root.transform.name
+    mu.obj = root
+    mu.materials = []
+    mu.textures = []
+    return mu
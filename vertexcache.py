@@ -0,0 +1,54 @@
+# vim:ts=4:et
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Reorder the triangles and vertices of the rendered meshes in .mu files for
+# the GPU vertex cache, reporting the average cache miss ratio (ACMR, vertices
+# transformed per triangle) before and after. -k sets the cache size.
+#   python3 vertexcache.py [-n] [-k cache] [-o output.mu] model.mu [...]
+
+from mu import VERTEX_CACHE_SIZE
+from rewrite import parse_args, rewrite_models
+
+def rendered_meshes(mu):
+    for obj in mu.hierarchy().objects:
+        if hasattr(obj, "shared_mesh") and hasattr(obj, "renderer"):
+            yield obj, obj.shared_mesh
+        if hasattr(obj, "skinned_mesh_renderer"):
+            yield obj, obj.skinned_mesh_renderer.mesh
+
+def main():
+    cache_size = VERTEX_CACHE_SIZE
+    opts, args = parse_args("vertexcache.py [-n] [-k cache] [-o output.mu] "
+                            "<mu-file> [mu-file ...]", "k:")
+    for o, a in opts:
+        if o == "-k":
+            cache_size = int(a)
+
+    def optimize(path, mu):
+        print(path)
+        for obj, mesh in rendered_meshes(mu):
+            before, after = mesh.optimize_vertex_cache(cache_size)
+            print("    %-32s %6d tris ACMR %.3f -> %.3f"
+                  % (obj.transform.name, sum(map(len, mesh.submeshes)),
+                     before, after))
+        return True
+    rewrite_models(opts, args, optimize, arrays=True)
+
+if __name__ == "__main__":
+    main()
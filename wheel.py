@@ -22,15 +22,11 @@ import sys
 
 wheel_colliders = {}
 
-def find_wheels(obj, path=""):
-    if not path:
-        path = obj.transform.name
-    else:
-        path = ".".join([path, obj.transform.name])
-    if hasattr(obj, "collider") and isinstance(obj.collider, MuColliderWheel):
-        wheel_colliders[path] = obj.collider
-    for o in obj.children:
-        find_wheels(o, path)
+def find_wheels(mu):
+    hierarchy = mu.hierarchy()
+    for obj, path in zip(hierarchy.objects, hierarchy.paths):
+        if hasattr(obj, "collider") and isinstance(obj.collider, MuColliderWheel):
+            wheel_colliders[path.replace("/", ".")] = obj.collider
 
 def spring_cfg(node, spring):
     node.AddValue("spring", spring.spring)
@@ -130,10 +126,10 @@ def adjust_wheel(wheel_node):
 def main():
     wheel_mu = sys.argv[1]
     mu = Mu()
-    if not mu.read(wheel_mu):
+    if not mu.read(wheel_mu, lazy=True):
         print("could not read: " + fname)
         raise
-    find_wheels(mu.obj)
+    find_wheels(mu)
     if len(sys.argv) > 2:
         node = ConfigNode.loadfile(sys.argv[2])
         wheel = node.GetNode('Wheel')